@@ -0,0 +1,54 @@
+"""
+Compare repeated analyses of the same function with and without a shared
+transfer cache, on NumPy octagons.
+
+Run from the repository root:
+    python -m benchmarks.transfer_cache
+"""
+import ast
+import time
+
+from src.abstract_domains.dbm_handler import DbmDomainHandler
+from src.interpreter.engine import AbstractInterpreterConfig, AbstractInterpreter
+from src.interpreter.transfer_cache import TransferCache
+
+INITIAL_ENV = {
+    'x': (0, 5),
+    'y': (0, 5)
+}
+
+def make_function(num_vars):
+    """
+    num_vars assignments followed by a loop incrementing every fourth variable.
+    """
+    lines = ["def func(x, y):"]
+    lines += [f"    v{i} = x + {i}" for i in range(num_vars)]
+    lines += ["    i = 0", "    while i < 10:"]
+    lines += [f"        v{i} = v{i} + 1" for i in range(0, num_vars, 4)]
+    lines += ["        if v0 < y:", "            y = y + 1", "        i = i + 1"]
+    return ast.parse("\n".join(lines)).body[0]
+
+def time_runs(func_ast, runs, cache, repeat = 3):
+    """
+    Best time of analyzing func_ast runs times, the cache is cleared before each repetition.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        if cache is not None:
+            cache.clear()
+        config = AbstractInterpreterConfig(domain_handler=DbmDomainHandler("oct"), transfer_cache=cache)
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            AbstractInterpreter(config).execute_on_ast(func_ast, INITIAL_ENV)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+if __name__ == "__main__":
+    print(f"{'vars':>5} {'runs':>5} {'plain (s)':>10} {'cached (s)':>11} {'hit rate':>9}")
+    for num_vars, runs in [(40, 2), (100, 1), (100, 3), (100, 10)]:
+        func_ast = make_function(num_vars)
+        cache = TransferCache()
+        plain_seconds = time_runs(func_ast, runs, None)
+        cached_seconds = time_runs(func_ast, runs, cache)
+        print(f"{num_vars:>5} {runs:>5} {plain_seconds:>10.3f} {cached_seconds:>11.3f} {cache.hit_rate:>9.2f}")
@@ -0,0 +1,5 @@
+def func(x, y):
+    a = x
+    b = x + 1
+    assert b > a
+    assert a >= 0
\ No newline at end of file
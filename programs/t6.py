@@ -0,0 +1,5 @@
+def func(x, y):
+    c = 0
+    while c <= 16:
+        c = c + 1
+        x = x + 2
\ No newline at end of file
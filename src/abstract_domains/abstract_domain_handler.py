@@ -1,11 +1,41 @@
+import math
 from abc import ABC, abstractmethod
-from typing import TypeVar, Generic
+from typing import Generic, Hashable, Optional, TypeVar
 from src.interpreter.expr_cons import LinearConstraint, LinearExpr
 
 # Declare a type variable representing your abstract state type
 StateT = TypeVar('AbstractState')
 
+def bounds_to_json(low, high) -> list:
+    """
+    [low, high] with None for unbounded ends and integral bounds as integers.
+    """
+    def to_json(value):
+        if math.isinf(value):
+            return None
+        return int(value) if float(value).is_integer() else float(value)
+
+    return [to_json(low), to_json(high)]
+
 class AbstractDomainHandler(ABC, Generic[StateT]):
+    """
+    Interface between the interpreter and an abstract domain library.
+
+    Thread-safety contract (relied upon by the parallel branch analysis):
+      - A state is only used by one thread at a time. Branches analyzed in
+        parallel each get their own state, nothing is shared between them.
+      - A worker thread never uses the handler it was given directly, it
+        uses fork() instead. Handlers whose library manager holds mutable
+        per-call data (scratch buffers, result flags, ...) must return a
+        handler with its own manager, stateless handlers can return self.
+      - Before a handler works on a state last used by another handler
+        (e.g. the original one, or the fork of another thread), the engine
+        calls adopt_state on it so that the state can be rebound to the
+        handler's own manager.
+    """
+    # Whether equal fingerprints imply equal states, see fingerprint
+    exact_fingerprint = False
+
     @abstractmethod
     def get_init_state(self, init_state_config) -> StateT:
         pass
@@ -36,4 +66,109 @@ class AbstractDomainHandler(ABC, Generic[StateT]):
 
     @abstractmethod
     def widen(self, state1:StateT, state2:StateT) -> StateT:
-        pass
\ No newline at end of file
+        pass
+
+    def assign_linexpr_array(self, state:StateT, vars, linexprs):
+        """
+        Parallel assignment, all linexprs are evaluated in the incoming state.
+
+        The default falls back to one assign_linexpr per variable which is
+        only equivalent when no linexpr reads a variable assigned before it,
+        handlers backed by a library with array assignments should override it.
+        """
+        for var, linexpr in zip(vars, linexprs):
+            self.assign_linexpr(state, var, linexpr)
+
+    def meet_lincons_array(self, state:StateT, lincons_list):
+        """
+        Meet with the conjunction of all the constraints in lincons_list.
+        """
+        for lincons in lincons_list:
+            self.meet_lincons(state, lincons)
+
+    @abstractmethod
+    def is_bottom(self, state:StateT) -> bool:
+        pass
+
+    @abstractmethod
+    def state_size(self, state:StateT) -> int:
+        """
+        Number of variables in the state.
+        """
+        pass
+
+    @abstractmethod
+    def fingerprint(self, state:StateT) -> Hashable:
+        """
+        Cheap key of the state. Equal states should have equal fingerprints,
+        or they will not share cache entries.
+
+        If exact_fingerprint is False, different states may share a
+        fingerprint as well and a match must be confirmed with are_states_equal.
+        Handlers without a cheap key return None, their transfers
+        are then never cached.
+        """
+        pass
+
+    @abstractmethod
+    def state_to_json(self, state:StateT) -> Optional[dict]:
+        """
+        Bounds of the variables as {var: bounds_to_json(low, high)}, None if
+        the state is bottom.
+        """
+        pass
+
+    def state_nbytes(self, state:StateT) -> int:
+        """
+        Approximate memory used by the state, a dense matrix of doubles unless
+        the handler knows better.
+        """
+        return 8 * (self.state_size(state) + 1) ** 2
+
+    def fork(self) -> 'AbstractDomainHandler[StateT]':
+        """
+        A handler that can be used from another thread concurrently with this one.
+        """
+        return self
+
+    def adopt_state(self, state:StateT):
+        """
+        Prepare a state last used by another handler to be used by this one.
+        """
+        pass
+
+    def close(self):
+        """
+        Release what the handler holds outside of Python, e.g. the native
+        manager of a handler returned by fork. The handler is not used afterwards.
+        """
+        pass
+
+    @abstractmethod
+    def add_var(self, state:StateT, var):
+        """
+        Add var to the state without any constraint on it.
+        """
+        pass
+
+    @abstractmethod
+    def remove_var(self, state:StateT, var):
+        """
+        Project var out of the state and drop it from the environment.
+        """
+        pass
+
+    def sat_lincons(self, state:StateT, lincons:LinearConstraint) -> bool:
+        """
+        Check whether every concrete state described by state satisfies lincons.
+
+        The state is met with each way of violating the constraint; the
+        constraint holds when all of those meets are empty.
+        """
+        for violation in lincons.violations():
+            violating_state = self.copy_state(state)
+            self.meet_lincons(violating_state, violation)
+            if not self.is_bottom(violating_state):
+                return False
+
+        return True
\ No newline at end of file
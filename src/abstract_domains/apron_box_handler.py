@@ -1,6 +1,6 @@
 import copy
 
-from src.abstract_domains.abstract_domain_handler import AbstractDomainHandler
+from src.abstract_domains.abstract_domain_handler import AbstractDomainHandler, bounds_to_json
 from src.interpreter.expr_cons import LinearConstraint, LinearExpr, Op
 
 from apronpy.box import PyBox, PyBoxDManager
@@ -19,6 +19,14 @@ class BoxState:
         self.var_set = var_set
 
 class ApronBoxDomain(AbstractDomainHandler[BoxState]):
+    # Boxes are non-relational, the variable bounds describe a state exactly
+    exact_fingerprint = True
+
+    def __init__(self):
+        # Every op of a box runs on the manager the box holds, the box manager
+        # has internal scratch space and cannot be used by two threads at once
+        self.manager = PyBoxDManager()
+
     ##
     ## Helper functions
     ##
@@ -46,7 +54,7 @@ class ApronBoxDomain(AbstractDomainHandler[BoxState]):
 
         return expr
 
-    def _lincons_to_apron_lincons_array(self, env, lincons:LinearConstraint):
+    def _lincons_to_apron_lincons(self, env, lincons:LinearConstraint):
         expr = PyLinexpr1(env)
 
         is_neg = False
@@ -72,7 +80,10 @@ class ApronBoxDomain(AbstractDomainHandler[BoxState]):
             Op.NE : ConsTyp.AP_CONS_DISEQ
         }
 
-        return PyLincons1Array([PyLincons1(op_to_apron_op_map[op], expr)])
+        return PyLincons1(op_to_apron_op_map[op], expr)
+
+    def _lincons_to_apron_lincons_array(self, env, lincons_list):
+        return PyLincons1Array([self._lincons_to_apron_lincons(env, lincons) for lincons in lincons_list])
 
     def _merge_state_environments(self, state1:BoxState, state2:BoxState):
         box1 = state1.box
@@ -88,9 +99,9 @@ class ApronBoxDomain(AbstractDomainHandler[BoxState]):
     ##
     def get_init_state(self, init_state_config) -> BoxState:
         if init_state_config is None:
-            return BoxState(PyBox.top(PyBoxDManager(), PyEnvironment()), set())
+            return BoxState(PyBox.top(self.manager, PyEnvironment()), set())
 
-        state = BoxState(PyBox.top(PyBoxDManager(), PyEnvironment()), set())
+        state = BoxState(PyBox.top(self.manager, PyEnvironment()), set())
         for var, bounds in init_state_config.items():
             state = self._add_var(state, var)
             new_box = PyBox(state.box.manager, state.box.environment, variables=[PyVar(var)], intervals=[PyDoubleInterval(bounds[0], bounds[1])])
@@ -119,8 +130,17 @@ class ApronBoxDomain(AbstractDomainHandler[BoxState]):
         state = self._add_var(state, var)
         state.box = state.box.assign(PyVar(var), expr)
 
+    def assign_linexpr_array(self, state:BoxState, vars, linexprs):
+        exprs = [self._linexpr_to_apron_linexpr(state.box.environment, linexpr) for linexpr in linexprs]
+        for var in vars:
+            state = self._add_var(state, var)
+        state.box = state.box.assign([PyVar(var) for var in vars], exprs)
+
     def meet_lincons(self, state, lincons:LinearConstraint):
-        cons_arr = self._lincons_to_apron_lincons_array(state.box.environment, lincons)
+        self.meet_lincons_array(state, [lincons])
+
+    def meet_lincons_array(self, state:BoxState, lincons_list):
+        cons_arr = self._lincons_to_apron_lincons_array(state.box.environment, lincons_list)
         state.box = state.box.meet(cons_arr)
 
     def join(self, state1:BoxState, state2:BoxState):
@@ -145,4 +165,47 @@ class ApronBoxDomain(AbstractDomainHandler[BoxState]):
         all_vars = list(set(state1.var_set) | set(state2.var_set))
         widened_box = box1.widening(box2)
 
-        return BoxState(widened_box, set(all_vars))
\ No newline at end of file
+        return BoxState(widened_box, set(all_vars))
+
+    def is_bottom(self, state:BoxState) -> bool:
+        return state.box.is_bottom()
+
+    def state_size(self, state:BoxState) -> int:
+        return len(state.var_set)
+
+    def fingerprint(self, state:BoxState):
+        if state.box.is_bottom():
+            return frozenset(state.var_set), None
+        return frozenset(state.var_set), frozenset((v, repr(state.box.bound_variable(PyVar(v)))) for v in state.var_set)
+
+    def state_to_json(self, state:BoxState):
+        if state.box.is_bottom():
+            return None
+
+        json_state = dict()
+        for v in sorted(state.var_set):
+            # The box manager works on doubles
+            interval = state.box.bound_variable(PyVar(v)).interval.contents
+            json_state[v] = bounds_to_json(interval.inf.contents.val.dbl, interval.sup.contents.val.dbl)
+
+        return json_state
+
+    def state_nbytes(self, state:BoxState) -> int:
+        # One interval of two doubles per variable
+        return 16 * (len(state.var_set) + 1)
+
+    def fork(self):
+        return ApronBoxDomain()
+
+    def adopt_state(self, state:BoxState):
+        state.box.manager = self.manager
+
+    def add_var(self, state:BoxState, var):
+        self._add_var(state, var)
+
+    def remove_var(self, state:BoxState, var):
+        if var not in state.var_set:
+            return
+
+        state.box.environment = state.box.environment.remove([PyVar(var)])
+        state.var_set.discard(var)
\ No newline at end of file
@@ -0,0 +1,544 @@
+import math
+from enum import Enum
+
+import numpy as np
+
+from src.abstract_domains.abstract_domain_handler import AbstractDomainHandler, bounds_to_json
+from src.interpreter.expr_cons import LinearConstraint, LinearExpr, Op
+
+# Temporary variable holding the old value of the target of an assignment
+OLD_VALUE_VAR = "__dbm_old"
+
+class DbmDomain(Enum):
+    """
+    Class to list all the domains supported by the difference-bound matrix handler.
+    """
+    OCT = "oct"
+    ZONES = "zones"
+
+    @classmethod
+    def from_value(cls, value):
+        for item in cls:
+            if item.value == value:
+                return item
+        raise ValueError(f"{value} is not a valid {cls.__name__}")
+
+class DbmState:
+    """
+    Class to capture the state during the abstract interpretation analysis.
+
+    matrix[i][j] is an upper bound of V_j - V_i, where for zones V_0 = 0 and
+    V_(d+1) is the variable of dimension d, and for octagons V_2d = x and
+    V_(2d+1) = -x for the variable x of dimension d. A None matrix is bottom.
+    closed is False when the matrix may not be (strongly) closed, i.e. for
+    the result of a widening.
+    """
+    def __init__(self, matrix, var_dim_map, closed = True):
+        super().__init__()
+        self.matrix = matrix
+        self.var_dim_map = var_dim_map
+        self.closed = closed
+
+_hash_weights = np.zeros(0, dtype=np.uint64)
+
+def _get_hash_weights(size):
+    # One array for all the sizes, only grown when a larger matrix shows up
+    global _hash_weights
+    if _hash_weights.size < size:
+        _hash_weights = np.arange(1, 2 * size + 1, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return _hash_weights[:size]
+
+class DbmFingerprint:
+    """
+    Hashable snapshot of a matrix, see DbmDomainHandler.fingerprint.
+
+    Hashing the raw bytes of the matrix costs about as much as an assignment,
+    the hash is a weighted sum of its 64-bit words instead.
+    """
+    __slots__ = ('var_order', 'matrix', '_hash')
+
+    def __init__(self, var_order, matrix):
+        self.var_order = var_order
+        # The snapshot is taken with + 0.0 so that -0.0 and 0.0 hash alike
+        self.matrix = matrix + 0.0 if matrix is not None else None
+
+        if self.matrix is None:
+            self._hash = hash((var_order, None))
+        else:
+            words = self.matrix.reshape(-1).view(np.uint64)
+            # np.dot wraps around in uint64 and, unlike a product and a sum, needs no temporary array
+            self._hash = hash((var_order, int(np.dot(words, _get_hash_weights(words.size)))))
+
+    def __eq__(self, other):
+        if not isinstance(other, DbmFingerprint):
+            return NotImplemented
+        if self._hash != other._hash or self.var_order != other.var_order:
+            return False
+        if self.matrix is None or other.matrix is None:
+            return self.matrix is other.matrix
+        return np.array_equal(self.matrix, other.matrix)
+
+    def __hash__(self):
+        return self._hash
+
+class DbmDomainHandler(AbstractDomainHandler[DbmState]):
+    """
+    Pure Python (NumPy) implementation of zones and octagons.
+
+    Closure is a vectorized min-plus Floyd-Warshall, meeting a constraint
+    uses the O(n^2) incremental closure, join and widening are elementwise
+    and adding a variable resizes the matrix. Variables are integer valued.
+    """
+    # Equal matrices are equal states, see fingerprint
+    exact_fingerprint = True
+
+    def __init__(self, domain_name):
+        self.dbm_domain = DbmDomain.from_value(domain_name)
+
+    ##
+    ## Helper functions
+    ##
+    def _is_oct(self):
+        return self.dbm_domain == DbmDomain.OCT
+
+    def _matrix_size(self, num_vars):
+        return 2 * num_vars if self._is_oct() else num_vars + 1
+
+    def _var_indices(self, dim):
+        """
+        Matrix indices of (x, -x) for octagons, (x, 0) for zones.
+        """
+        if self._is_oct():
+            return 2 * dim, 2 * dim + 1
+        return dim + 1, 0
+
+    def _top_matrix(self, num_vars):
+        size = self._matrix_size(num_vars)
+        matrix = np.full((size, size), np.inf)
+        np.fill_diagonal(matrix, 0)
+        return matrix
+
+    def _strengthen(self, matrix):
+        indices = np.arange(matrix.shape[0])
+        bar = indices ^ 1
+
+        # Variables are integers, so the unary bounds 2x <= c can be tightened to even values
+        matrix[indices, bar] = 2 * np.floor(matrix[indices, bar] / 2)
+
+        # m[i][j] <= (m[i][bar(i)] + m[bar(j)][j]) / 2 where bar(i) = i ^ 1
+        unary_from = matrix[indices, bar]
+        unary_to = matrix[bar, indices]
+        np.minimum(matrix, (unary_from[:, None] + unary_to[None, :]) / 2, out=matrix)
+
+    def _check_diagonal(self, matrix):
+        """
+        Returns None if the matrix has a negative cycle (bottom), the matrix otherwise.
+        """
+        diagonal = np.diagonal(matrix)
+        if np.any(diagonal < 0):
+            return None
+        np.fill_diagonal(matrix, 0)
+        return matrix
+
+    def _closure(self, matrix):
+        """
+        (Strong) closure of a copy of matrix, None if it is empty.
+        """
+        matrix = matrix.copy()
+        for k in range(matrix.shape[0]):
+            np.minimum(matrix, matrix[:, k, None] + matrix[None, k, :], out=matrix)
+
+        if self._is_oct():
+            self._strengthen(matrix)
+
+        return self._check_diagonal(matrix)
+
+    def _closed_matrix(self, state:DbmState):
+        """
+        Closed matrix of the state, the state itself is left untouched.
+        """
+        if state.closed or state.matrix is None:
+            return state.matrix
+        return self._closure(state.matrix)
+
+    def _close(self, state:DbmState):
+        if not state.closed:
+            state.matrix = self._closure(state.matrix) if state.matrix is not None else None
+            state.closed = True
+
+    def _add_edge(self, matrix, src, dst, bound):
+        """
+        Incremental closure after tightening the bound of V_dst - V_src in a closed matrix.
+        """
+        if bound >= matrix[src, dst]:
+            return
+        np.minimum(matrix, np.add.outer(matrix[:, src], matrix[dst, :]) + bound, out=matrix)
+
+    def _add_constraint(self, state:DbmState, coeffs, bound):
+        """
+        Meet with sum(coeff * var) <= bound, the constraint must be
+        representable in the domain (see _normalize).
+        """
+        matrix = state.matrix
+        dims = [(state.var_dim_map[var], coeff) for var, coeff in coeffs.items()]
+        # Unit coefficients over integers, the sum is an integer as well
+        if math.isinf(bound):
+            return
+        bound = math.floor(bound)
+
+        if self._is_oct():
+            if len(dims) == 1:
+                dim, coeff = dims[0]
+                pos, neg = self._var_indices(dim)
+                # x <= c is V_2d - V_(2d+1) <= 2c
+                src, dst = (neg, pos) if coeff > 0 else (pos, neg)
+                self._add_edge(matrix, src, dst, 2 * bound)
+            else:
+                (dim_i, coeff_i), (dim_j, coeff_j) = dims
+                # coeff_j * x_j = V_dst and coeff_i * x_i = -V_src
+                dst = self._var_indices(dim_j)[0 if coeff_j > 0 else 1]
+                src = self._var_indices(dim_i)[1 if coeff_i > 0 else 0]
+                self._add_edge(matrix, src, dst, bound)
+                self._add_edge(matrix, dst ^ 1, src ^ 1, bound)
+            self._strengthen(matrix)
+        else:
+            if len(dims) == 1:
+                dim, coeff = dims[0]
+                var_index, zero_index = self._var_indices(dim)
+                src, dst = (zero_index, var_index) if coeff > 0 else (var_index, zero_index)
+            else:
+                # x_dst - x_src <= bound
+                (dim_pos, _), (dim_neg, _) = sorted(dims, key=lambda dim_coeff: -dim_coeff[1])
+                dst, src = self._var_indices(dim_pos)[0], self._var_indices(dim_neg)[0]
+            self._add_edge(matrix, src, dst, bound)
+
+        state.matrix = self._check_diagonal(matrix)
+
+    def _normalize(self, coeffs, bound):
+        """
+        Rewrite sum(coeff * var) <= bound into a constraint of the domain, i.e.
+        unit coefficients with +-x, +-x+-y (octagons) or x, -x, x-y (zones).
+        Returns None if that is not possible.
+        """
+        if len(coeffs) == 1:
+            (var, coeff), = coeffs.items()
+            return {var: math.copysign(1, coeff)}, bound / abs(coeff)
+
+        if len(coeffs) == 2:
+            (var_i, coeff_i), (var_j, coeff_j) = coeffs.items()
+            if abs(coeff_i) != abs(coeff_j):
+                return None
+            if not self._is_oct() and coeff_i == coeff_j:
+                return None
+            scale = abs(coeff_i)
+            return {var_i: coeff_i / scale, var_j: coeff_j / scale}, bound / scale
+
+        return None
+
+    def _get_bounds(self, matrix, dim):
+        pos, neg = self._var_indices(dim)
+        if self._is_oct():
+            return -matrix[pos, neg] / 2, matrix[neg, pos] / 2
+        return -matrix[pos, neg], matrix[neg, pos]
+
+    def _eval_interval(self, state:DbmState, coeffs, offset, skip_var = None):
+        """
+        Interval of sum(coeff * var) + offset (without the skip_var term) in a
+        closed non-bottom state.
+        """
+        low = high = offset
+        for var, coeff in coeffs.items():
+            if var == skip_var or coeff == 0:
+                continue
+            var_low, var_high = self._get_bounds(state.matrix, state.var_dim_map[var])
+            if coeff > 0:
+                low, high = low + coeff * var_low, high + coeff * var_high
+            else:
+                low, high = low + coeff * var_high, high + coeff * var_low
+        return low, high
+
+    def _meet_upper_bound(self, state:DbmState, coeffs, bound):
+        """
+        Meet with sum(coeff * var) <= bound, falling back to the implied
+        variable bounds if the constraint is not representable.
+        """
+        coeffs = {var: coeff for var, coeff in coeffs.items() if coeff != 0}
+
+        if not coeffs:
+            if bound < 0:
+                state.matrix = None
+            return
+
+        normalized = self._normalize(coeffs, bound)
+        if normalized is not None:
+            self._add_constraint(state, *normalized)
+            return
+
+        # coeff_k * x_k <= bound - sum(coeff_l * x_l) <= bound - min(sum(coeff_l * x_l))
+        var_bounds = []
+        for var, coeff in coeffs.items():
+            rest_low, _ = self._eval_interval(state, coeffs, 0, var)
+            if not math.isinf(rest_low):
+                var_bounds.append((var, coeff, bound - rest_low))
+
+        for var, coeff, var_bound in var_bounds:
+            if state.matrix is None:
+                return
+            self._add_constraint(state, {var: math.copysign(1, coeff)}, var_bound / abs(coeff))
+
+    def _forget(self, state:DbmState, dim):
+        pos, neg = self._var_indices(dim)
+        forgotten = [pos, neg] if self._is_oct() else [pos]
+        state.matrix[forgotten, :] = np.inf
+        state.matrix[:, forgotten] = np.inf
+        state.matrix[forgotten, forgotten] = 0
+
+    def _shift(self, state:DbmState, dim, offset):
+        """
+        x := x + offset, keeps the matrix closed.
+        """
+        matrix = state.matrix
+        pos, neg = self._var_indices(dim)
+        matrix[:, pos] += offset
+        matrix[pos, :] -= offset
+        if self._is_oct():
+            matrix[:, neg] -= offset
+            matrix[neg, :] += offset
+        np.fill_diagonal(matrix, 0)
+
+    def _assign_forget(self, state:DbmState, var, coeffs, offset):
+        """
+        x := sum(coeff * var) + offset by collecting everything known about
+        the new value in the incoming state, then forgetting x and adding it back.
+        """
+        low, high = self._eval_interval(state, coeffs, offset)
+        relations = []
+        for other_var, coeff in coeffs.items():
+            if other_var == var or abs(coeff) != 1 or (coeff < 0 and not self._is_oct()):
+                continue
+            # x - coeff * y is in the interval of the rest of the expression
+            relations.append((other_var, coeff, self._eval_interval(state, coeffs, offset, other_var)))
+
+        self._forget(state, state.var_dim_map[var])
+
+        if not math.isinf(high):
+            self._add_constraint(state, {var: 1}, high)
+        if not math.isinf(low) and state.matrix is not None:
+            self._add_constraint(state, {var: -1}, -low)
+        for other_var, coeff, (rel_low, rel_high) in relations:
+            if state.matrix is not None and not math.isinf(rel_high):
+                self._add_constraint(state, {var: 1, other_var: -coeff}, rel_high)
+            if state.matrix is not None and not math.isinf(rel_low):
+                self._add_constraint(state, {var: -1, other_var: coeff}, -rel_low)
+
+    def _aligned_matrices(self, state1:DbmState, state2:DbmState):
+        """
+        Matrices of both states over the union of their variables, in the
+        order of state1 (followed by the variables only in state2). The
+        matrix of state1 is not closed, the one of state2 is.
+        """
+        if state1.var_dim_map == state2.var_dim_map:
+            return state1.matrix, self._closed_matrix(state2), dict(state1.var_dim_map)
+
+        var_dim_map = dict(state1.var_dim_map)
+        for var in state2.var_dim_map:
+            if var not in var_dim_map:
+                var_dim_map[var] = len(var_dim_map)
+
+        def align(state, matrix):
+            if matrix is None:
+                return None
+            # Fresh variables come from an unconstrained block appended to the matrix
+            num_vars = len(state.var_dim_map)
+            padded = np.full((self._matrix_size(len(var_dim_map)),) * 2, np.inf)
+            padded[:matrix.shape[0], :matrix.shape[0]] = matrix
+            np.fill_diagonal(padded, 0)
+
+            next_fresh = num_vars
+            dims = [0] * len(var_dim_map)
+            for var, dim in var_dim_map.items():
+                if var in state.var_dim_map:
+                    dims[dim] = state.var_dim_map[var]
+                else:
+                    dims[dim] = next_fresh
+                    next_fresh += 1
+
+            if self._is_oct():
+                order = [2 * d + k for d in dims for k in (0, 1)]
+            else:
+                order = [0] + [d + 1 for d in dims]
+            return padded[np.ix_(order, order)]
+
+        return align(state1, state1.matrix), align(state2, self._closed_matrix(state2)), var_dim_map
+
+    ##
+    ## Main functions
+    ##
+    def get_init_state(self, init_state_config) -> DbmState:
+        if init_state_config is None:
+            return DbmState(self._top_matrix(0), dict())
+
+        var_dim_map = {var: dim for dim, var in enumerate(init_state_config)}
+        matrix = self._top_matrix(len(var_dim_map))
+        for var, bounds in init_state_config.items():
+            pos, neg = self._var_indices(var_dim_map[var])
+            factor = 2 if self._is_oct() else 1
+            matrix[pos, neg] = -factor * bounds[0]
+            matrix[neg, pos] = factor * bounds[1]
+
+        return DbmState(self._closure(matrix), var_dim_map)
+
+    def print_state(self, state:DbmState):
+        print("-------------------------------------------")
+        matrix = self._closed_matrix(state)
+        if matrix is None:
+            print("bottom")
+        else:
+            for var, dim in state.var_dim_map.items():
+                print(f"{var} -> {list(self._get_bounds(matrix, dim))}")
+        print(state.var_dim_map)
+        print("-------------------------------------------")
+
+    def copy_state(self, state:DbmState) -> DbmState:
+        matrix = state.matrix.copy() if state.matrix is not None else None
+        return DbmState(matrix, dict(state.var_dim_map), state.closed)
+
+    def are_states_equal(self, state1:DbmState, state2:DbmState) -> bool:
+        if set(state1.var_dim_map) != set(state2.var_dim_map):
+            return False
+
+        matrix1, matrix2, _ = self._aligned_matrices(state1, state2)
+        if state1.matrix is not None and not state1.closed:
+            matrix1 = self._closure(matrix1)
+
+        if matrix1 is None or matrix2 is None:
+            return matrix1 is None and matrix2 is None
+        return np.array_equal(matrix1, matrix2)
+
+    def assign_linexpr(self, state:DbmState, var, linexpr:LinearExpr):
+        self.add_var(state, var)
+        self._close(state)
+        if state.matrix is None:
+            return
+
+        dim = state.var_dim_map[var]
+        coeffs = dict(linexpr.coeffs)
+        self_coeff = coeffs.get(var, 0)
+        is_unit_coeff = self_coeff == 1 or (self_coeff == -1 and self._is_oct())
+
+        if is_unit_coeff and len(coeffs) == 1:
+            # x := +-x + c is invertible, swap x and -x if needed and shift
+            if self_coeff == -1:
+                pos, neg = self._var_indices(dim)
+                order = np.arange(state.matrix.shape[0])
+                order[[pos, neg]] = order[[neg, pos]]
+                state.matrix = state.matrix[np.ix_(order, order)]
+            self._shift(state, dim, linexpr.offset)
+            return
+
+        if is_unit_coeff:
+            # x := +-x + e, keep the old value of x to relate the new one to it
+            self.add_var(state, OLD_VALUE_VAR)
+            self._add_constraint(state, {OLD_VALUE_VAR: 1, var: -1}, 0)
+            self._add_constraint(state, {OLD_VALUE_VAR: -1, var: 1}, 0)
+            coeffs[OLD_VALUE_VAR] = coeffs.pop(var)
+
+        self._assign_forget(state, var, coeffs, linexpr.offset)
+        self.remove_var(state, OLD_VALUE_VAR)
+
+    def meet_lincons(self, state:DbmState, lincons:LinearConstraint):
+        lincons = lincons.tighten()
+        for var in lincons.expr.coeffs:
+            self.add_var(state, var)
+        self._close(state)
+        if state.matrix is None:
+            return
+
+        coeffs = dict(lincons.expr.coeffs)
+        negated_coeffs = {var: -coeff for var, coeff in coeffs.items()}
+        offset = lincons.expr.offset
+
+        # Strict constraints that could not be tightened are over-approximated by non-strict ones
+        if lincons.op in (Op.LE, Op.LT, Op.EQ):
+            self._meet_upper_bound(state, coeffs, -offset)
+        if lincons.op in (Op.GE, Op.GT, Op.EQ) and state.matrix is not None:
+            self._meet_upper_bound(state, negated_coeffs, offset)
+        if lincons.op == Op.NE and not any(coeff != 0 for coeff in coeffs.values()) and offset == 0:
+            state.matrix = None
+
+    def join(self, state1:DbmState, state2:DbmState) -> DbmState:
+        matrix1, matrix2, var_dim_map = self._aligned_matrices(state1, state2)
+        if state1.matrix is not None and not state1.closed:
+            matrix1 = self._closure(matrix1)
+
+        if matrix1 is None:
+            return DbmState(matrix2.copy() if matrix2 is not None else None, var_dim_map)
+        if matrix2 is None:
+            return DbmState(matrix1.copy(), var_dim_map)
+
+        # The join of closed matrices is closed
+        return DbmState(np.maximum(matrix1, matrix2), var_dim_map)
+
+    def widen(self, state1:DbmState, state2:DbmState) -> DbmState:
+        # The left argument is not closed, closing it could prevent termination
+        matrix1, matrix2, var_dim_map = self._aligned_matrices(state1, state2)
+
+        if matrix1 is None:
+            return DbmState(matrix2.copy() if matrix2 is not None else None, var_dim_map)
+        if matrix2 is None:
+            return DbmState(matrix1.copy(), var_dim_map, state1.closed)
+
+        return DbmState(np.where(matrix2 <= matrix1, matrix1, np.inf), var_dim_map, closed=False)
+
+    def is_bottom(self, state:DbmState) -> bool:
+        return self._closed_matrix(state) is None
+
+    def state_size(self, state:DbmState) -> int:
+        return len(state.var_dim_map)
+
+    def fingerprint(self, state:DbmState):
+        # The matrix is used as it is. Closing it first would make the key
+        # canonical but costs O(n^3), more than most transfers, and a widened
+        # state must not be closed in place. A state that is not closed only
+        # misses the cache more often.
+        var_order = tuple(sorted(state.var_dim_map, key=state.var_dim_map.get))
+        return DbmFingerprint(var_order, state.matrix)
+
+    def state_to_json(self, state:DbmState):
+        matrix = self._closed_matrix(state)
+        if matrix is None:
+            return None
+        return {var: bounds_to_json(*self._get_bounds(matrix, dim)) for var, dim in sorted(state.var_dim_map.items())}
+
+    def state_nbytes(self, state:DbmState) -> int:
+        return state.matrix.nbytes if state.matrix is not None else 0
+
+    def add_var(self, state:DbmState, var):
+        if var in state.var_dim_map:
+            return
+
+        state.var_dim_map[var] = len(state.var_dim_map)
+        if state.matrix is None:
+            return
+
+        # Grow the matrix, the new variable is unconstrained
+        size = state.matrix.shape[0]
+        new_size = self._matrix_size(len(state.var_dim_map))
+        matrix = np.full((new_size, new_size), np.inf)
+        matrix[:size, :size] = state.matrix
+        matrix[range(size, new_size), range(size, new_size)] = 0
+        state.matrix = matrix
+
+    def remove_var(self, state:DbmState, var):
+        if var not in state.var_dim_map:
+            return
+
+        self._close(state)
+        removed_dim = state.var_dim_map[var]
+        state.var_dim_map = {v: (dim - 1 if dim > removed_dim else dim)
+                             for v, dim in state.var_dim_map.items() if v != var}
+
+        if state.matrix is not None:
+            pos, neg = self._var_indices(removed_dim)
+            removed = [pos, neg] if self._is_oct() else [pos]
+            state.matrix = np.delete(np.delete(state.matrix, removed, axis=0), removed, axis=1)
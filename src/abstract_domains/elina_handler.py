@@ -1,8 +1,10 @@
 import copy
+import math
 
+from ctypes import byref, c_double
 from enum import Enum
 
-from src.abstract_domains.abstract_domain_handler import AbstractDomainHandler
+from src.abstract_domains.abstract_domain_handler import AbstractDomainHandler, bounds_to_json
 from src.interpreter.expr_cons import LinearConstraint, LinearExpr, Op
 
 ##
@@ -10,7 +12,9 @@ from src.interpreter.expr_cons import LinearConstraint, LinearExpr, Op
 ##
 from elina_abstract0 import *
 from elina_dimension import *
+from elina_interval import *
 from elina_lincons0 import *
+from elina_manager import *
 from elina_tcons import *
 from elina_texpr0 import *
 from elina_scalar import *
@@ -172,17 +176,7 @@ class ElinaDomainHandler(AbstractDomainHandler[ElinaState]):
 
         return elina_linexpr
     
-    def _lincons_to_elina_lincons_array(self, lincons:LinearConstraint, var_dim_map):
-        multiplier = 1
-        op = lincons.op
-
-        if op == Op.LE:
-            multiplier = -1
-            op = Op.GE
-        elif op == Op.LT:
-            multiplier = -1
-            op = Op.GT
-
+    def _lincons_to_elina_lincons_array(self, lincons_list, var_dim_map):
         op_to_elina_op_map = {
             Op.EQ : ElinaConstyp.ELINA_CONS_EQ,
             Op.GE : ElinaConstyp.ELINA_CONS_SUPEQ,
@@ -190,9 +184,21 @@ class ElinaDomainHandler(AbstractDomainHandler[ElinaState]):
             Op.NE : ElinaConstyp.ELINA_CONS_DISEQ
         }
 
-        elina_lincons_arr = elina_lincons0_array_make(1)
-        elina_lincons_arr.p[0].linexpr0 = self._linexpr_to_elina_linexpr(lincons.expr, var_dim_map, multiplier)
-        elina_lincons_arr.p[0].constyp = op_to_elina_op_map[op]
+        elina_lincons_arr = elina_lincons0_array_make(len(lincons_list))
+
+        for i, lincons in enumerate(lincons_list):
+            multiplier = 1
+            op = lincons.op
+
+            if op == Op.LE:
+                multiplier = -1
+                op = Op.GE
+            elif op == Op.LT:
+                multiplier = -1
+                op = Op.GT
+
+            elina_lincons_arr.p[i].linexpr0 = self._linexpr_to_elina_linexpr(lincons.expr, var_dim_map, multiplier)
+            elina_lincons_arr.p[i].constyp = op_to_elina_op_map[op]
 
         return elina_lincons_arr
 
@@ -210,11 +216,20 @@ class ElinaDomainHandler(AbstractDomainHandler[ElinaState]):
     ## Main functions
     ##
     def get_init_state(self, init_state_config) -> ElinaState:
+        state = ElinaState(elina_abstract0_top(self.elina_man, 0, 0), dict())
         if init_state_config is None:
-            return ElinaState(elina_abstract0_top(self.elina_man, 0, 0), dict())
+            return state
 
-        # We do not handle init_state_config yet!!
-        assert(False)
+        # Add a dimension per variable and bound it with the given interval
+        for var, bounds in init_state_config.items():
+            self._get_var_dim(state, var)
+            var_expr = LinearExpr({var: 1}, 0)
+            if not math.isinf(bounds[0]):
+                self.meet_lincons(state, LinearConstraint(var_expr, Op.GE, LinearExpr({}, bounds[0])))
+            if not math.isinf(bounds[1]):
+                self.meet_lincons(state, LinearConstraint(var_expr, Op.LE, LinearExpr({}, bounds[1])))
+
+        return state
 
     def print_state(self, state:ElinaState):
         print("-------------------------------------------")
@@ -248,9 +263,32 @@ class ElinaDomainHandler(AbstractDomainHandler[ElinaState]):
                                                                  dim, elina_texpr,
                                                                  1, None)
 
+    def assign_linexpr_array(self, state:ElinaState, vars, linexprs):
+        # Add the dimensions first so that all linexprs see the same mapping
+        for var in vars:
+            self._get_var_dim(state, var)
+
+        size = len(vars)
+        dims = (ElinaDim * size)(*[state.var_dim_map[var] for var in vars])
+        elina_linexprs = [self._linexpr_to_elina_linexpr(linexpr, state.var_dim_map) for linexpr in linexprs]
+
+        if self._use_elina_linexprs():
+            elina_linexpr_arr = (ElinaLinexpr0Ptr * size)(*elina_linexprs)
+            state.elina_obj = elina_abstract0_assign_linexpr_array(self.elina_man, False, state.elina_obj,
+                                                                   dims, elina_linexpr_arr,
+                                                                   size, None)
+        else:
+            elina_texpr_arr = (ElinaTexpr0Ptr * size)(*[elina_texpr0_from_linexpr0(e) for e in elina_linexprs])
+            state.elina_obj = elina_abstract0_assign_texpr_array(self.elina_man, False, state.elina_obj,
+                                                                 dims, elina_texpr_arr,
+                                                                 size, None)
+
     def meet_lincons(self, state:ElinaState, lincons:LinearConstraint):
+        self.meet_lincons_array(state, [lincons])
+
+    def meet_lincons_array(self, state:ElinaState, lincons_list):
         # Get the elina lincons array from the parsed lincons
-        elina_lincons_array = self._lincons_to_elina_lincons_array(lincons, state.var_dim_map)
+        elina_lincons_array = self._lincons_to_elina_lincons_array(lincons_list, state.var_dim_map)
 
         if self._use_elina_linexprs():
             # Take the meet with the elina lincons array
@@ -274,4 +312,69 @@ class ElinaDomainHandler(AbstractDomainHandler[ElinaState]):
         assert(state1.var_dim_map == state2.var_dim_map)
 
         return ElinaState(elina_abstract0_widening(self.elina_man, state1.elina_obj, state2.elina_obj),
-                                                   new_var_dim_map)
\ No newline at end of file
+                                                   new_var_dim_map)
+
+    def is_bottom(self, state:ElinaState) -> bool:
+        return elina_abstract0_is_bottom(self.elina_man, state.elina_obj)
+
+    def state_size(self, state:ElinaState) -> int:
+        return len(state.var_dim_map)
+
+    def fingerprint(self, state:ElinaState):
+        # Reading the canonical constraints back from ELINA costs about as much
+        # as the transfer functions themselves, ELINA states are not cached
+        return None
+
+    def state_to_json(self, state:ElinaState):
+        if self.is_bottom(state):
+            return None
+
+        json_state = dict()
+        for var, dim in sorted(state.var_dim_map.items()):
+            interval = elina_abstract0_bound_dimension(self.elina_man, state.elina_obj, dim)
+            low, high = c_double(), c_double()
+            elina_double_set_scalar(byref(low), interval.contents.inf, MpfrRnd.MPFR_RNDD)
+            elina_double_set_scalar(byref(high), interval.contents.sup, MpfrRnd.MPFR_RNDU)
+            elina_interval_free(interval)
+            json_state[var] = bounds_to_json(low.value, high.value)
+
+        return json_state
+
+    def state_nbytes(self, state:ElinaState) -> int:
+        if self.elina_domain == ElinaDomain.OCT:
+            # Half of the 2n x 2n matrix of doubles
+            num_vars = len(state.var_dim_map)
+            return 8 * 2 * num_vars * (num_vars + 1)
+        return super().state_nbytes(state)
+
+    def fork(self):
+        # Every elina_abstract0_t keeps a counted reference to the manager that
+        # built it, but ELINA only checks that the manager passed to an
+        # operation is of the same library as that one. A fresh manager of the
+        # same domain can thus work on the states of this handler as they are
+        return ElinaDomainHandler(self.elina_domain.value, self.use_elina_linexprs)
+
+    def close(self):
+        # States built by this manager hold their own reference to it
+        elina_manager_free(self.elina_man)
+        self.elina_man = None
+
+    def add_var(self, state:ElinaState, var):
+        self._get_var_dim(state, var)
+
+    def remove_var(self, state:ElinaState, var):
+        if var not in state.var_dim_map:
+            return
+
+        removed_dim = state.var_dim_map[var]
+        dimchange = elina_dimchange_alloc(1, 0)
+        dimchange.contents.dim[0] = removed_dim
+
+        state.elina_obj = elina_abstract0_remove_dimensions(self.elina_man, False, state.elina_obj, dimchange)
+
+        elina_dimchange_free(dimchange)
+
+        # The dimensions after the removed one move down by one. The map can
+        # be shared with other states after a join, so build a fresh one.
+        state.var_dim_map = {v: (dim - 1 if dim > removed_dim else dim)
+                             for v, dim in state.var_dim_map.items() if v != var}
\ No newline at end of file
@@ -0,0 +1,120 @@
+import ast
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from src.abstract_domains.abstract_domain_handler import AbstractDomainHandler
+from src.interpreter.expr_cons import LinearConstraint, LinearExpr, Op, VariableTable
+from src.interpreter.fusion import ParallelAssign
+from src.interpreter.parser import parse_conjunction, parse_expr
+
+# Fresh variable counting the loop iterations, only alive during acceleration
+ITERATION_VAR = "__accel_n"
+
+@dataclass
+class CounterLoop:
+    """
+    A loop `while condition: v += increments[v] ...` with constant increments.
+    """
+    condition: LinearConstraint
+    increments: Dict[str, float]
+
+def _get_assignments(stmt):
+    if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+        return [(stmt.targets[0].id, stmt.value)]
+
+    if isinstance(stmt, ParallelAssign):
+        return [(target.id, value) for target, value in zip(stmt.targets, stmt.values)]
+
+    return None
+
+def match_counter_loop(node: ast.While, var_table:VariableTable = None) -> Optional[CounterLoop]:
+    """
+    Recognize loops guarded by a single linear constraint whose body only
+    consists of constant increments `v = v + k`. Returns None for any other loop.
+    The guard and the increments are interned in var_table.
+    """
+    if node.orelse:
+        return None
+
+    try:
+        conditions = parse_conjunction(node.test, var_table)
+    except (ValueError, KeyError):
+        return None
+
+    if len(conditions) != 1:
+        return None
+
+    increments = dict()
+    for stmt in node.body:
+        assignments = _get_assignments(stmt)
+        if assignments is None:
+            return None
+
+        for var, value in assignments:
+            try:
+                expr = parse_expr(value, var_table)
+            except ValueError:
+                return None
+
+            # Anything but `var + constant` (e.g. `x = x + y`) has no linear closed form
+            other_coeffs = [coeff for v, coeff in expr.coeffs.items() if v != var]
+            if expr.coeffs.get(var, 0) != 1 or any(coeff != 0 for coeff in other_coeffs):
+                return None
+
+            increments[var] = increments.get(var, 0) + expr.offset
+
+    if not increments:
+        return None
+
+    return CounterLoop(conditions[0], increments)
+
+def accelerate(domain_handler:AbstractDomainHandler, state, loop:CounterLoop):
+    """
+    Compute the exit state of loop in closed form, without any fixpoint
+    iteration. The passed state is consumed.
+
+    After n iterations every variable is v0 + n * increments[v]. The loop
+    exits either right away (n = 0 and the guard fails), or after n >= 1
+    iterations where the guard held before the last increment and fails
+    after it. As the guard is linear and the trajectory is a line, the guard
+    holding at the first and at the last iteration implies it held in between.
+
+    Both facts are first stated over the incoming variables and n, so that n
+    is bounded before the increments are applied. Applying the increments
+    with an unbounded n would lose the increments that are not +-1 in the
+    domains that cannot relate v to n.
+    """
+    exit_condition = loop.condition.negate().tighten()
+    table = loop.condition.expr.table
+
+    # Zero iterations
+    no_iter_state = domain_handler.copy_state(state)
+    domain_handler.meet_lincons(no_iter_state, exit_condition)
+
+    # One or more iterations
+    domain_handler.meet_lincons(state, loop.condition)
+    domain_handler.add_var(state, ITERATION_VAR)
+    domain_handler.meet_lincons(state, LinearConstraint(LinearExpr({ITERATION_VAR: 1}, 0, table), Op.GE, LinearExpr({}, 1, table)))
+
+    # The guard at v0 + n * increments[v] is guard(v0) + shift * n
+    shift = sum(coeff * loop.increments.get(var, 0) for var, coeff in loop.condition.expr.coeffs.items())
+    guard_coeffs = {**loop.condition.expr.coeffs, ITERATION_VAR: shift}
+
+    # The guard held before the last iteration (after n - 1 increments) and fails after it
+    before_last_expr = LinearExpr(guard_coeffs, loop.condition.expr.offset - shift, table)
+    domain_handler.meet_lincons(state, LinearConstraint.from_expr(before_last_expr, loop.condition.op))
+    after_last_expr = LinearExpr(guard_coeffs, loop.condition.expr.offset, table)
+    domain_handler.meet_lincons(state, LinearConstraint.from_expr(after_last_expr, loop.condition.op).negate().tighten())
+
+    vars = list(loop.increments)
+    exprs = [LinearExpr({var: 1, ITERATION_VAR: loop.increments[var]}, 0, table) for var in vars]
+    domain_handler.assign_linexpr_array(state, vars, exprs)
+
+    # The same facts over the new values, i.e. the guard held for v - increments[v]
+    last_iter_expr = LinearExpr(dict(loop.condition.expr.coeffs), loop.condition.expr.offset - shift, table)
+    domain_handler.meet_lincons(state, LinearConstraint.from_expr(last_iter_expr, loop.condition.op))
+    domain_handler.meet_lincons(state, exit_condition)
+
+    domain_handler.remove_var(state, ITERATION_VAR)
+
+    return domain_handler.join(no_iter_state, state)
@@ -0,0 +1,97 @@
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+
+from src.abstract_domains.abstract_domain_handler import AbstractDomainHandler
+from src.interpreter.engine import AbstractInterpreter, AbstractInterpreterConfig
+from src.utils import get_function_asts, read_code_from_file
+
+@dataclass
+class CascadeStage:
+    """
+    One domain of the cascade, cheapest stages come first.
+    """
+    name: str
+    domain_handler: AbstractDomainHandler
+
+@dataclass
+class PropertyReport:
+    """
+    Final verdict for one `assert` statement of an analyzed function.
+    """
+    function_name: str
+    lineno: int
+    col_offset: int
+    condition: str
+    proved_by: Optional[str] = None # Name of the first stage that proved it, None if no stage did
+
+    @property
+    def proved(self):
+        return self.proved_by is not None
+
+def default_cascade_stages() -> List[CascadeStage]:
+    """
+    Boxes, then zones, then octagons.
+
+    The domain handlers are imported here so that the native libraries are
+    only needed when the default cascade is actually used.
+    """
+    from src.abstract_domains.apron_box_handler import ApronBoxDomain
+    from src.abstract_domains.elina_handler import ElinaDomainHandler
+
+    return [
+        CascadeStage("box", ApronBoxDomain()),
+        CascadeStage("zones", ElinaDomainHandler("zones")),
+        CascadeStage("oct", ElinaDomainHandler("oct")),
+    ]
+
+class CascadeAnalyzer:
+    """
+    Analyze functions with increasingly precise (and expensive) domains.
+
+    Every function is first analyzed with the first stage. A function is
+    re-analyzed with the next stage only while some of its assertions remain
+    unproved, so the relational domains are only paid for where the cheaper
+    ones were not precise enough.
+    """
+    def __init__(self, stages:List[CascadeStage] = None, base_config:AbstractInterpreterConfig = None):
+        self.stages = stages if stages is not None else default_cascade_stages()
+        self.base_config = base_config
+
+        if len(self.stages) == 0:
+            raise ValueError("A cascade needs at least one stage.")
+
+    def _get_stage_config(self, stage:CascadeStage):
+        if self.base_config is None:
+            return AbstractInterpreterConfig(domain_handler=stage.domain_handler)
+
+        return replace(self.base_config, domain_handler=stage.domain_handler)
+
+    def execute(self, code_filename, function_names, init_state_config = None) -> List[PropertyReport]:
+        code = read_code_from_file(code_filename)
+
+        reports = []
+        for func_ast in get_function_asts(code, function_names):
+            reports.extend(self.execute_on_ast(func_ast, init_state_config))
+
+        return reports
+
+    def execute_on_ast(self, func_ast, init_state_config = None) -> List[PropertyReport]:
+        reports: Dict[tuple, PropertyReport] = dict()
+
+        for stage in self.stages:
+            with AbstractInterpreter(self._get_stage_config(stage)) as abs_interpreter:
+                abs_interpreter.execute_on_ast(func_ast, init_state_config)
+
+            for result in abs_interpreter.assertion_results.values():
+                key = (result.lineno, result.col_offset)
+                if key not in reports:
+                    reports[key] = PropertyReport(func_ast.name, result.lineno, result.col_offset, result.condition)
+
+                if result.proved and not reports[key].proved:
+                    reports[key].proved_by = stage.name
+
+            if all(report.proved for report in reports.values()):
+                # Nothing left for the more expensive stages to prove
+                break
+
+        return sorted(reports.values(), key=lambda report: (report.lineno, report.col_offset))
@@ -0,0 +1,156 @@
+import ast
+import copy
+from typing import Dict, Tuple
+
+from src.interpreter.expr_cons import LinearExpr, Op, VariableTable
+from src.interpreter.parser import parse_conjunction, parse_expr
+
+class _SubstituteConstants(ast.NodeTransformer):
+    def __init__(self, env):
+        super().__init__()
+        self.env = env
+
+    def visit_Name(self, node: ast.Name):
+        if isinstance(node.ctx, ast.Load) and node.id in self.env:
+            return ast.copy_location(ast.Constant(self.env[node.id]), node)
+        return node
+
+def _get_assigned_vars(stmts):
+    assigned = set()
+    for stmt in stmts:
+        for node in ast.walk(stmt):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                assigned.add(node.id)
+    return assigned
+
+def _fold_expr(node, env, var_table):
+    """
+    Substitute the known constants in node. Returns the new node and its
+    value if it folds to a constant, None otherwise.
+    """
+    node = _SubstituteConstants(env).visit(node)
+
+    try:
+        expr = parse_expr(node, var_table)
+    except ValueError:
+        return node, None
+
+    if not isinstance(expr, LinearExpr) or any(coeff != 0 for coeff in expr.coeffs.values()):
+        return node, None
+
+    return ast.copy_location(ast.Constant(expr.offset), node), expr.offset
+
+def _fold_guard(node, env, var_table):
+    """
+    Substitute the known constants in a guard. Returns the new node and
+    True/False if the guard folds to a constant, None otherwise.
+    """
+    node = _SubstituteConstants(env).visit(node)
+
+    try:
+        conditions = parse_conjunction(node, var_table)
+    except (ValueError, KeyError):
+        return node, None
+
+    evaluate = {
+        Op.LE: lambda v: v <= 0,
+        Op.LT: lambda v: v < 0,
+        Op.GE: lambda v: v >= 0,
+        Op.GT: lambda v: v > 0,
+        Op.EQ: lambda v: v == 0,
+        Op.NE: lambda v: v != 0
+    }
+
+    value = True
+    for condition in conditions:
+        if any(coeff != 0 for coeff in condition.expr.coeffs.values()):
+            value = None
+        elif not evaluate[condition.op](condition.expr.offset):
+            # One false conjunct decides the whole guard
+            return node, False
+
+    return node, value
+
+def _merge_envs(env1, env2):
+    return {var: val for var, val in env1.items() if var in env2 and env2[var] == val}
+
+def _propagate_block(stmts, env, var_table):
+    """
+    Fold stmts given the constants known in env and return the new list of
+    statements. env is updated to the constants known after the block.
+    """
+    folded_stmts = []
+
+    for stmt in stmts:
+        if isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name):
+            var = stmt.targets[0].id
+            stmt.value, value = _fold_expr(stmt.value, env, var_table)
+            if value is None:
+                env.pop(var, None)
+            else:
+                env[var] = value
+            folded_stmts.append(stmt)
+
+        elif isinstance(stmt, ast.If):
+            stmt.test, value = _fold_guard(stmt.test, env, var_table)
+
+            if value is True:
+                # Only the if branch is reachable, inline it
+                folded_stmts.extend(_propagate_block(stmt.body, env, var_table))
+            elif value is False:
+                folded_stmts.extend(_propagate_block(stmt.orelse, env, var_table))
+            else:
+                else_env = dict(env)
+                stmt.body = _propagate_block(stmt.body, env, var_table)
+                stmt.orelse = _propagate_block(stmt.orelse, else_env, var_table)
+                merged_env = _merge_envs(env, else_env)
+                env.clear()
+                env.update(merged_env)
+                folded_stmts.append(stmt)
+
+        elif isinstance(stmt, ast.While):
+            # Variables written in the loop are unknown at the loop head
+            for var in _get_assigned_vars(stmt.body):
+                env.pop(var, None)
+
+            stmt.test, value = _fold_guard(stmt.test, env, var_table)
+
+            if value is False:
+                # The loop body is never executed
+                continue
+
+            stmt.body = _propagate_block(stmt.body, dict(env), var_table)
+            folded_stmts.append(stmt)
+
+        else:
+            for var in _get_assigned_vars([stmt]):
+                env.pop(var, None)
+            folded_stmts.append(stmt)
+
+    return folded_stmts
+
+def propagate_constants(func_ast:ast.FunctionDef, var_table:VariableTable = None) -> Tuple[ast.FunctionDef, Dict[str, tuple]]:
+    """
+    Return a copy of func_ast with constants propagated, linear arithmetic on
+    constants folded and branches with constant guards pruned.
+
+    The leading run of constant assignments is removed from the copy and
+    returned as an initial environment ({var: (value, value)}) instead, so
+    that the domain starts from it rather than paying one assignment each.
+
+    The expressions parsed along the way are interned in var_table.
+    """
+    folded_ast = copy.deepcopy(func_ast)
+    folded_ast.body = _propagate_block(folded_ast.body, dict(), var_table)
+
+    leading_constants = dict()
+    while folded_ast.body:
+        stmt = folded_ast.body[0]
+        if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1 and isinstance(stmt.targets[0], ast.Name)
+                and isinstance(stmt.value, ast.Constant)):
+            break
+
+        leading_constants[stmt.targets[0].id] = (stmt.value.value, stmt.value.value)
+        folded_ast.body.pop(0)
+
+    return folded_ast, leading_constants
@@ -1,10 +1,22 @@
 import ast
-from dataclasses import dataclass
+import json
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import asdict, dataclass, replace
+from typing import Optional
 
 from src.abstract_domains.abstract_domain_handler import AbstractDomainHandler
-from src.interpreter.expr_cons import LinearConstraint, LinearExpr, Op
-from src.interpreter.parser import parse_cons, parse_expr
-from src.utils import get_function_ast, read_code_from_file
+from src.interpreter.acceleration import accelerate, match_counter_loop
+from src.interpreter.const_prop import propagate_constants
+from src.interpreter.expr_cons import LinearConstraint, LinearExpr, VariableTable
+from src.interpreter.fusion import ParallelAssign, fuse_statements
+from src.interpreter.parser import parse_conjunction, parse_expr
+from src.interpreter.profiler import AnalysisProfiler, ProfiledDomainHandler, get_frame_name
+from src.interpreter.transfer_cache import TransferCache, cons_key, expr_key
+from src.utils import get_function_ast, iter_function_sources, parse_function_source, read_code_from_file
 
 @dataclass
 class AbstractInterpreterConfig:
@@ -13,13 +25,47 @@ class AbstractInterpreterConfig:
     
     # Optional fields
     widening_delay: int = 3 # Number of widening free iterations
+    statement_fusion: bool = False # Batch independent assignments into one parallel assignment
+    constant_propagation: bool = False # Fold constants and prune constant branches before the analysis
+    loop_acceleration: bool = False # Compute the exit state of constant-increment loops in closed form
+    profiler: Optional[AnalysisProfiler] = None # Attribute domain time to the analyzed statements
+    parallel_branches: bool = False # Analyze the branches of if/elif/else chains on a thread pool
+    parallel_workers: int = 4 # Number of threads of the pool
+    parallel_min_vars: int = 32 # Only analyze branches in parallel on states with at least this many variables
+    transfer_cache: Optional[TransferCache] = None # Serve repeated assignments, meets and joins from an LRU cache, unused with parallel_branches
+
+@dataclass
+class AssertionResult:
+    """
+    Outcome of checking one `assert` statement against the abstract state.
+    """
+    lineno: int
+    col_offset: int
+    condition: str
+    proved: bool
 
 class AbstractInterpreter(ast.NodeVisitor):
     def __init__(self, config:AbstractInterpreterConfig):
         super().__init__()
         self.config = config
+        self.domain_handler = config.domain_handler
+        if config.profiler is not None:
+            self.domain_handler = ProfiledDomainHandler(config.domain_handler, config.profiler)
+        if config.transfer_cache is not None and config.parallel_branches:
+            warnings.warn("The transfer cache is not used when parallel_branches is set", RuntimeWarning)
+
         self._init_state = None
         self._curr_state = None
+        self._var_table = VariableTable()
+        self._parsed = dict() # AST node -> its parsed expression or guard, per analyzed function
+        self.assertion_results = dict()
+
+        # The thread pool and the forked handlers of its threads live as long
+        # as the interpreter, they are released by close()
+        self._executor = None
+        self._thread_handlers = threading.local() # Forked domain handler of each worker thread
+        self._forked_handlers = []
+        self._forked_handlers_lock = threading.Lock()
 
     def execute(self, code_filename, function_name, init_state_config = None):
         # Parse code and get function
@@ -28,14 +74,108 @@ class AbstractInterpreter(ast.NodeVisitor):
 
         return self.execute_on_ast(func_ast, init_state_config)
 
+    def execute_stream(self, code_filename, out_file, init_state_config = None, function_names = None):
+        """
+        Analyze the top-level functions of a file one at a time and write one
+        JSON line per function to out_file. Only one function is parsed and
+        analyzed at a time, so memory is bounded by the largest function.
+
+        Each line holds the function name, its line, the bounds of the final
+        state and the assertion results, or an error if the function uses
+        unsupported constructs or cannot be parsed. Returns the number of
+        lines written.
+        """
+        written = 0
+        for function_name, first_line, source in iter_function_sources(code_filename):
+            if function_names is not None and function_name not in function_names:
+                continue
+
+            result = {"function": function_name, "lineno": first_line}
+            func_ast = None
+
+            # One function failing, even to parse, must not end the analysis of the file
+            try:
+                func_ast = parse_function_source(source, first_line)
+                result["lineno"] = func_ast.lineno
+                final_state = self.execute_on_ast(func_ast, init_state_config)
+                result["state"] = self.domain_handler.state_to_json(final_state)
+                result["assertions"] = [asdict(r) for r in self.assertion_results.values()]
+            except (SyntaxError, NotImplementedError, ValueError) as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+            del source
+
+            out_file.write(json.dumps(result) + "\n")
+            written += 1
+
+            # Release the AST and the states before the next function
+            del func_ast
+            final_state = None
+            self._init_state = None
+            self._curr_state = None
+            self.assertion_results = dict()
+            self._var_table = VariableTable()
+            self._parsed = dict()
+
+        return written
+
     def execute_on_ast(self, code_ast, init_state_config = None):
+        self._var_table = VariableTable() # Expressions are interned per analyzed function
+        self._parsed = dict()
+
+        if self.config.constant_propagation:
+            code_ast, leading_constants = propagate_constants(code_ast, self._var_table)
+            if leading_constants:
+                init_state_config = {**(init_state_config or dict()), **leading_constants}
+
+        if self.config.statement_fusion:
+            code_ast = fuse_statements(code_ast, self._var_table)
+
         # Set initial and current state
-        self._init_state = self.config.domain_handler.get_init_state(init_state_config)
+        with self._profile_frame("init_state"):
+            self._init_state = self.domain_handler.get_init_state(init_state_config)
         self._curr_state = self._init_state
+        self.assertion_results = dict()
 
+        if self.config.parallel_branches and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.config.parallel_workers)
         self.visit(code_ast)
 
         return self._curr_state
+
+    def close(self):
+        """
+        Shut down the thread pool of the parallel branches and release the
+        domain handlers forked for it. Leaving a with block on the interpreter
+        closes it.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+        for handler in self._forked_handlers:
+            handler.close()
+        self._forked_handlers = []
+        self._thread_handlers = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _profile_frame(self, name):
+        if self.config.profiler is None:
+            return nullcontext()
+        return self.config.profiler.frame(name)
+
+    def visit(self, node):
+        # Statements get their own profile frame, everything else is
+        # attributed to the enclosing statement
+        if self.config.profiler is None or not isinstance(node, ast.stmt):
+            return super().visit(node)
+
+        with self._profile_frame(get_frame_name(node)):
+            return super().visit(node)
     
     def visit_FunctionDef(self, node):
         for stmt in node.body:
@@ -45,68 +185,296 @@ class AbstractInterpreter(ast.NodeVisitor):
         # Ignore argument nodes completely for now
         pass
 
+    def _cached_transfer(self, transfer_key, states, transfer):
+        """
+        Return the result of transfer() on states, or serve it from the
+        transfer cache if the same transfer was applied to equal states before.
+        transfer may consume the states.
+        """
+        cache = self.config.transfer_cache
+        # Cached states would be shared by the managers of the worker threads,
+        # __init__ warns about this combination
+        if cache is None or self.config.parallel_branches:
+            return transfer()
+
+        handler = self.domain_handler
+        lookup_start = time.perf_counter()
+        fingerprints = tuple(handler.fingerprint(state) for state in states)
+        if any(fingerprint is None for fingerprint in fingerprints):
+            return transfer()
+
+        # The same fingerprint means different states in different domains,
+        # entries are only shared between interpreters of the same handler
+        key = (self.config.domain_handler, transfer_key, fingerprints)
+
+        def is_valid(entry):
+            cached_states, _ = entry
+            return handler.exact_fingerprint or \
+                all(handler.are_states_equal(state, cached_state) for state, cached_state in zip(states, cached_states))
+
+        entry = cache.get(key, is_valid)
+        if entry is not None:
+            return handler.copy_state(entry[1])
+        lookup_seconds = time.perf_counter() - lookup_start
+
+        # Without exact fingerprints the inputs are needed to confirm later hits
+        cached_states = () if handler.exact_fingerprint else tuple(handler.copy_state(state) for state in states)
+        # Either the input copies or the fingerprints in the key are about as large as the inputs
+        nbytes = sum(handler.state_nbytes(state) for state in states)
+
+        transfer_start = time.perf_counter()
+        result = transfer()
+        if time.perf_counter() - transfer_start <= lookup_seconds:
+            # A hit would cost as much as the transfer, do not spend a copy and
+            # cache space on it
+            return result
+
+        cached_result = handler.copy_state(result)
+        cache.put(key, (cached_states, cached_result), nbytes + handler.state_nbytes(cached_result))
+
+        return result
+
+    def _assign(self, state, vars, exprs):
+        """
+        Assign exprs to vars in parallel, the passed state is consumed.
+        """
+        def transfer():
+            if len(vars) == 1:
+                self.domain_handler.assign_linexpr(state, vars[0], exprs[0])
+            else:
+                self.domain_handler.assign_linexpr_array(state, vars, exprs)
+            return state
+
+        transfer_key = ("assign", tuple(vars), tuple(expr_key(expr) for expr in exprs))
+        return self._cached_transfer(transfer_key, [state], transfer)
+
+    def _meet(self, state, conditions):
+        """
+        Meet state with the conjunction of conditions, the passed state is consumed.
+        """
+        def transfer():
+            self.domain_handler.meet_lincons_array(state, conditions)
+            return state
+
+        transfer_key = ("meet", tuple(cons_key(condition) for condition in conditions))
+        return self._cached_transfer(transfer_key, [state], transfer)
+
+    def _join(self, state1, state2):
+        return self._cached_transfer(("join",), [state1, state2], lambda: self.domain_handler.join(state1, state2))
+
     def visit_Assign(self, node):
+        if len(node.targets) != 1 or not isinstance(node.targets[0], ast.Name):
+            raise NotImplementedError(f"Only assignments to a single variable are supported: {ast.unparse(node)}")
+
         var = node.targets[0].id
-        expr = parse_expr(node.value)
+        expr = self._parse_expr(node.value)
         if isinstance(expr, LinearExpr):
-            self.config.domain_handler.assign_linexpr(self._curr_state, var, expr)
+            self._curr_state = self._assign(self._curr_state, [var], [expr])
+
+    def _parse_expr(self, node):
+        # Loop bodies are visited once per iteration, parse their statements once
+        expr = self._parsed.get(node)
+        if expr is None:
+            expr = parse_expr(node, self._var_table)
+            self._parsed[node] = expr
+        return expr
+
+    def visit_ParallelAssign(self, node: ParallelAssign):
+        vars = [target.id for target in node.targets]
+        exprs = [self._parse_expr(value) for value in node.values]
+        self._curr_state = self._assign(self._curr_state, vars, exprs)
+
+    def _parse_guard(self, test):
+        conditions = self._parsed.get(test)
+        if conditions is not None:
+            return conditions
+
+        conditions = parse_conjunction(test, self._var_table)
+
+        for condition in conditions:
+            if not isinstance(condition, LinearConstraint):
+                raise NotImplementedError("Non-linear cons: " + str(condition))
+
+        self._parsed[test] = conditions
+        return conditions
+
+    def _meet_negation(self, state, conditions):
+        """
+        Meet state with !(c1 and ... and cn), i.e. the join of the state met
+        with each !ci. The passed state is consumed.
+        """
+        negated_states = []
+        for condition in conditions[:-1]:
+            negated_state = self.domain_handler.copy_state(state)
+            self.domain_handler.meet_lincons(negated_state, condition.negate())
+            negated_states.append(negated_state)
+
+        # The last disjunct can reuse the state itself
+        self.domain_handler.meet_lincons(state, conditions[-1].negate())
+        negated_states.append(state)
+
+        result = negated_states[0]
+        for negated_state in negated_states[1:]:
+            result = self.domain_handler.join(result, negated_state)
+
+        return result
 
     def visit_While(self, node: ast.While):
-        condition = parse_cons(node.test)
+        if self.config.loop_acceleration:
+            counter_loop = match_counter_loop(node, self._var_table)
+            if counter_loop is not None:
+                self._curr_state = accelerate(self.domain_handler, self._curr_state, counter_loop)
+                return
 
-        if not isinstance(condition, LinearConstraint):
-            raise NotImplementedError("Non-linear cons: " + condition)
+        conditions = self._parse_guard(node.test)
 
-        invariant = self.config.domain_handler.copy_state(self._curr_state)
+        invariant = self.domain_handler.copy_state(self._curr_state)
         itr_ctr = 0
 
         while True:
-            # Meet with condition and execute loop body
-            self.config.domain_handler.meet_lincons(self._curr_state, condition)
-            self.visit(node.body)
-            itr_ctr += 1
+            with self._profile_frame(f"iteration {itr_ctr + 1}"):
+                # Meet with condition and execute loop body
+                self._curr_state = self._meet(self._curr_state, conditions)
+                self.visit(node.body)
+                itr_ctr += 1
 
-            # Join with current invariant (and widen if after the widening delay) to get the new invariant
-            new_invariant = self.config.domain_handler.join(invariant, self._curr_state)
-            if itr_ctr > self.config.widening_delay:
-                new_invariant = self.config.domain_handler.widen(invariant, new_invariant)
+                # Join with current invariant (and widen if after the widening delay) to get the new invariant
+                new_invariant = self._join(invariant, self._curr_state)
+                if itr_ctr > self.config.widening_delay:
+                    new_invariant = self.domain_handler.widen(invariant, new_invariant)
 
-            if self.config.domain_handler.are_states_equal(invariant, new_invariant):
+                converged = self.domain_handler.are_states_equal(invariant, new_invariant)
+
+            if converged:
                 # If the new invariant is same as old, we have converged and can break
                 break
             else:
-                invariant = self.config.domain_handler.copy_state(new_invariant)
+                invariant = self.domain_handler.copy_state(new_invariant)
                 self._curr_state = new_invariant
 
         # After the invariant is found, the state is (Inv and !B)
-        self._curr_state = invariant
-        condition.op = Op.negate(condition.op)
-        self.config.domain_handler.meet_lincons(self._curr_state, condition)
+        self._curr_state = self._meet_negation(invariant, conditions)
+
+    def _get_branches(self, node: ast.If):
+        """
+        Flatten an if/elif/.../else chain into (conditions, body) pairs, the
+        conditions of the final else branch are None.
+        """
+        branches = []
+        while True:
+            branches.append((self._parse_guard(node.test), node.body))
+            if len(node.orelse) == 1 and isinstance(node.orelse[0], ast.If):
+                node = node.orelse[0]
+            else:
+                branches.append((None, node.orelse))
+                return branches
+
+    def _analyze_branch(self, state, body, profile_stack):
+        """
+        Analyze one branch on a worker thread. Returns the final state of the
+        branch and the assertion results collected in it.
+        """
+        handler = getattr(self._thread_handlers, 'handler', None)
+        if handler is None:
+            handler = self.config.domain_handler.fork()
+            self._thread_handlers.handler = handler
+            with self._forked_handlers_lock:
+                self._forked_handlers.append(handler)
+        handler.adopt_state(state)
+
+        # Nested ifs of the branch are analyzed sequentially on this thread
+        # The transfer cache is unused on the pool, the owner already warned about it
+        branch_interpreter = AbstractInterpreter(replace(self.config, domain_handler=handler, transfer_cache=None))
+        branch_interpreter._var_table = self._var_table
+        branch_interpreter._parsed = self._parsed
+        branch_interpreter._curr_state = state
+
+        if self.config.profiler is None:
+            branch_interpreter.visit(body)
+        else:
+            with self.config.profiler.continue_stack(profile_stack):
+                branch_interpreter.visit(body)
+
+        return branch_interpreter._curr_state, branch_interpreter.assertion_results
+
+    def _visit_If_parallel(self, node: ast.If):
+        branches = self._get_branches(node)
+
+        # The entry states only need cheap meets, compute all of them before
+        # handing the branch bodies to the pool
+        entry_states = []
+        remaining_state = self._curr_state
+        for conditions, _ in branches:
+            if conditions is None:
+                entry_states.append(remaining_state)
+                continue
+
+            entry_state = self.domain_handler.copy_state(remaining_state)
+            self.domain_handler.meet_lincons_array(entry_state, conditions)
+            entry_states.append(entry_state)
+            remaining_state = self._meet_negation(remaining_state, conditions)
+
+        profile_stack = self.config.profiler.get_stack() if self.config.profiler is not None else None
+        futures = [self._executor.submit(self._analyze_branch, entry_state, body, profile_stack)
+                   for entry_state, (_, body) in zip(entry_states, branches)]
+        results = [future.result() for future in futures]
+
+        # Merge in branch order so that the outcome does not depend on scheduling
+        branch_states = []
+        for branch_state, assertion_results in results:
+            self.domain_handler.adopt_state(branch_state)
+            branch_states.append(branch_state)
+            for result in assertion_results.values():
+                self._record_assertion(result)
+
+        # Join right to left, the same order as the sequential analysis of the nested elifs
+        joined_state = branch_states[-1]
+        for branch_state in reversed(branch_states[:-1]):
+            joined_state = self.domain_handler.join(branch_state, joined_state)
+
+        self._curr_state = joined_state
 
     def visit_If(self, node):
-        condition = parse_cons(node.test)
+        if self._executor is not None and \
+                self.domain_handler.state_size(self._curr_state) >= self.config.parallel_min_vars:
+            self._visit_If_parallel(node)
+            return
 
-        if not isinstance(condition, LinearConstraint):
-            raise NotImplementedError("Non-linear cons: " + condition)
-        
-        if_cond_copy = self.config.domain_handler.copy_state(self._curr_state)
-        else_cond_copy = self.config.domain_handler.copy_state(self._curr_state)
+        conditions = self._parse_guard(node.test)
+
+        if_cond_copy = self.domain_handler.copy_state(self._curr_state)
+        else_cond_copy = self.domain_handler.copy_state(self._curr_state)
 
         # If branch
-        self.config.domain_handler.meet_lincons(if_cond_copy, condition)
-        self._curr_state = if_cond_copy
+        self._curr_state = self._meet(if_cond_copy, conditions)
         self.visit(node.body)
-        if_cond_copy = self.config.domain_handler.copy_state(self._curr_state)
+        if_cond_copy = self.domain_handler.copy_state(self._curr_state)
 
         # Else branch
-        condition.op = Op.negate(condition.op)
-        self.config.domain_handler.meet_lincons(else_cond_copy, condition)
-        self._curr_state = else_cond_copy
+        self._curr_state = self._meet_negation(else_cond_copy, conditions)
         self.visit(node.orelse)
-        else_cond_copy = self.config.domain_handler.copy_state(self._curr_state)
+        else_cond_copy = self.domain_handler.copy_state(self._curr_state)
 
         # Join
-        self._curr_state = self.config.domain_handler.join(if_cond_copy, else_cond_copy)
+        self._curr_state = self._join(if_cond_copy, else_cond_copy)
+
+    def _record_assertion(self, result:AssertionResult):
+        # Asserts inside loops are visited once per iteration, they are only
+        # proved if they hold on every visit
+        key = (result.lineno, result.col_offset)
+        if key in self.assertion_results and not self.assertion_results[key].proved:
+            result = replace(result, proved=False)
+        self.assertion_results[key] = result
+
+    def visit_Assert(self, node: ast.Assert):
+        conditions = self._parse_guard(node.test)
+
+        proved = all(self.domain_handler.sat_lincons(self._curr_state, condition) for condition in conditions)
+
+        self._record_assertion(AssertionResult(node.lineno, node.col_offset, ast.unparse(node.test), proved))
+
+        # Execution only continues past the assert when the condition holds
+        self._curr_state = self._meet(self._curr_state, conditions)
 
     def visit_list(self, node):
         return [self.visit(elt) for elt in node]
@@ -1,28 +1,198 @@
 import ast
+import threading
+import weakref
 from enum import Enum
+from types import MappingProxyType
 from typing import Dict
 
 class AbstractExpr:
-    pass
+    __slots__ = ()
 
 class AbstractCons:
-    pass
+    __slots__ = ()
+
+def _typed(values):
+    # 1, 1.0 and True are equal and hash alike, intern keys must keep them apart
+    return tuple((type(v), v) for v in values)
+
+class VariableTable:
+    """
+    Maps variable names to dense indices, typically one table per analyzed
+    function. Expressions and constraints are hash-consed per table: building
+    an expression equal to an existing one returns that same object.
+
+    Tables created with intern=False only map names. They back the expressions
+    built without a table, which are not worth a hash-consing dictionary.
+    """
+    __slots__ = ('_indices', '_names', '_interned', '_lock', '__weakref__')
+
+    def __init__(self, intern:bool = True):
+        self._indices = dict()
+        self._names = []
+        self._interned = weakref.WeakValueDictionary() if intern else None
+        self._lock = threading.Lock()
+
+    def index(self, var) -> int:
+        """
+        Index of var, var is added to the table if it is not there yet.
+        """
+        if var not in self._indices:
+            with self._lock:
+                if var not in self._indices:
+                    self._indices[var] = len(self._names)
+                    self._names.append(var)
+        return self._indices[var]
+
+    def name(self, index) -> str:
+        return self._names[index]
+
+    @property
+    def interns(self) -> bool:
+        return self._interned is not None
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, var):
+        return var in self._indices
+
+    def _intern(self, key, make):
+        """
+        Return the live object interned under key, or intern the result of make().
+        """
+        if self._interned is None:
+            return make()
+
+        obj = self._interned.get(key)
+        if obj is not None:
+            return obj
+
+        with self._lock:
+            obj = self._interned.get(key)
+            if obj is None:
+                obj = make()
+                self._interned[key] = obj
+            return obj
 
 class LinearExpr(AbstractExpr):
-    def __init__(self, coeffs: Dict[str, float], offset: float):
-        self.coeffs = coeffs
-        self.offset = offset
+    """
+    Immutable `sum(dense_coeffs[i] * table.name(i)) + offset`.
+
+    Instances are hash-consed per variable table, so equal expressions of the
+    same table are the same object. An expression built without a table gets a
+    private, non-interning table of its own, there is no process-wide table
+    that would keep growing with every name seen. Equality and hashing are by
+    content, so expressions of different tables still compare as expected.
+
+    Parsing builds its intermediate sums as plain dicts, see parser.py, only
+    the final expressions go through the table.
+    """
+    __slots__ = ('table', 'dense_coeffs', 'offset', '_coeffs', '_hash', '__weakref__')
+
+    def __new__(cls, coeffs: Dict[str, float], offset: float, table: VariableTable = None):
+        if table is None:
+            table = VariableTable(intern=False)
+
+        indexed_coeffs = {table.index(var): coeff for var, coeff in coeffs.items() if coeff != 0}
+        dense_coeffs = [0] * (max(indexed_coeffs) + 1 if indexed_coeffs else 0)
+        for index, coeff in indexed_coeffs.items():
+            dense_coeffs[index] = coeff
+
+        return cls.from_dense(table, dense_coeffs, offset)
+
+    @classmethod
+    def from_dense(cls, table: VariableTable, dense_coeffs, offset: float):
+        # Zeros of any type stand for the same absent variable
+        dense_coeffs = [coeff if coeff != 0 else 0 for coeff in dense_coeffs]
+        # Trailing zeros are dropped so that the representation does not
+        # depend on how many variables the table had at construction time
+        while dense_coeffs and dense_coeffs[-1] == 0:
+            dense_coeffs.pop()
+        dense_coeffs = tuple(dense_coeffs)
+
+        def make():
+            expr = object.__new__(cls)
+            object.__setattr__(expr, 'table', table)
+            object.__setattr__(expr, 'dense_coeffs', dense_coeffs)
+            object.__setattr__(expr, 'offset', offset)
+            object.__setattr__(expr, '_coeffs', None)
+            object.__setattr__(expr, '_hash', None)
+            return expr
+
+        return table._intern((cls, _typed(dense_coeffs), type(offset), offset), make)
+
+    @property
+    def coeffs(self):
+        """
+        Read-only {var: coeff} view of the non-zero coefficients.
+        """
+        if self._coeffs is None:
+            coeffs = {self.table.name(i): coeff for i, coeff in enumerate(self.dense_coeffs) if coeff != 0}
+            object.__setattr__(self, '_coeffs', MappingProxyType(coeffs))
+        return self._coeffs
+
+    def in_table(self, table: VariableTable):
+        """
+        The same expression, interned in table.
+        """
+        if table is self.table:
+            return self
+        return LinearExpr(self.coeffs, self.offset, table)
 
     def scale(self, factor: float):
-        return LinearExpr({k: v * factor for k, v in self.coeffs.items()}, self.offset * factor)
+        return LinearExpr.from_dense(self.table, [v * factor for v in self.dense_coeffs], self.offset * factor)
+
+    def shift(self, delta: float):
+        """
+        The expression plus the constant delta.
+        """
+        return LinearExpr.from_dense(self.table, self.dense_coeffs, self.offset + delta)
 
     @staticmethod
     def combine(lhs, rhs, op):
-        coeffs = lhs.coeffs.copy()
-        for k, v in rhs.coeffs.items():
-            coeffs[k] = coeffs.get(k, 0) + (v if isinstance(op, (ast.Add,)) else -v)
-        offset = lhs.offset + (rhs.offset if isinstance(op, (ast.Add,)) else -rhs.offset)
-        return LinearExpr(coeffs, offset)
+        # Constants carry no variables, they can join the table of the other side
+        if not lhs.dense_coeffs and lhs.table is not rhs.table:
+            lhs = lhs.in_table(rhs.table)
+        rhs = rhs.in_table(lhs.table)
+
+        sign = 1 if isinstance(op, (ast.Add,)) else -1
+        size = max(len(lhs.dense_coeffs), len(rhs.dense_coeffs))
+        lhs_coeffs = lhs.dense_coeffs + (0,) * (size - len(lhs.dense_coeffs))
+        rhs_coeffs = rhs.dense_coeffs + (0,) * (size - len(rhs.dense_coeffs))
+
+        dense_coeffs = [l + sign * r for l, r in zip(lhs_coeffs, rhs_coeffs)]
+        return LinearExpr.from_dense(lhs.table, dense_coeffs, lhs.offset + sign * rhs.offset)
+
+    def _content_key(self):
+        coeffs = frozenset((var, type(coeff), coeff) for var, coeff in self.coeffs.items())
+        return coeffs, type(self.offset), self.offset
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, LinearExpr):
+            return NotImplemented
+        if self.table is other.table and self.table.interns:
+            # Equal expressions of an interning table are the same object
+            return False
+        return self._content_key() == other._content_key()
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, '_hash', hash(self._content_key()))
+        return self._hash
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memodict=None):
+        return self
 
     def __repr__(self):
         terms = [f"{v}*{k}" for k, v in self.coeffs.items()]
@@ -62,17 +232,78 @@ class Op(Enum):
 
 
 class LinearConstraint(AbstractCons):
-    def __init__(self, lhs: 'LinearExpr', op: Op, rhs: 'LinearExpr'):
-        combined_coeffs = lhs.coeffs.copy()
-        for k, v in rhs.coeffs.items():
-            combined_coeffs[k] = combined_coeffs.get(k, 0) - v
-        combined_offset = lhs.offset - rhs.offset
+    """
+    Immutable `expr op 0`, hash-consed in the variable table of expr.
+    """
+    __slots__ = ('expr', 'op', '__weakref__')
+
+    def __new__(cls, lhs: 'LinearExpr', op: Op, rhs: 'LinearExpr'):
+        return cls.from_expr(LinearExpr.combine(lhs, rhs, ast.Sub()), op)
+
+    @classmethod
+    def from_expr(cls, expr: LinearExpr, op: Op):
+        def make():
+            lincons = object.__new__(cls)
+            object.__setattr__(lincons, 'expr', expr)
+            object.__setattr__(lincons, 'op', op)
+            return lincons
 
-        self.expr = LinearExpr(combined_coeffs, combined_offset)
-        self.op = op
+        # expr is interned in the same table and kept alive by the constraint,
+        # so its id cannot be reused while the entry exists
+        return expr.table._intern((cls, id(expr), op), make)
 
     def negate(self):
-        return LinearConstraint(self.expr, self.op.negate(), LinearExpr({}, 0))
+        return LinearConstraint.from_expr(self.expr, self.op.negate())
+
+    def tighten(self):
+        """
+        Turn a strict constraint into the equivalent non-strict one when all
+        coefficients are integral (program variables are integer valued).
+        """
+        if self.op not in (Op.LT, Op.GT):
+            return self
+
+        values = list(self.expr.coeffs.values()) + [self.expr.offset]
+        if not all(float(v).is_integer() for v in values):
+            return self
+
+        if self.op == Op.LT:
+            # e < 0  <=>  e + 1 <= 0
+            return LinearConstraint.from_expr(self.expr.shift(1), Op.LE)
+        # e > 0  <=>  e - 1 >= 0
+        return LinearConstraint.from_expr(self.expr.shift(-1), Op.GE)
+
+    def violations(self):
+        """
+        Constraints whose union is exactly the set of points violating this one.
+        """
+        if self.op == Op.EQ:
+            return [LinearConstraint.from_expr(self.expr, Op.LT).tighten(),
+                    LinearConstraint.from_expr(self.expr, Op.GT).tighten()]
+
+        return [self.negate().tighten()]
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, LinearConstraint):
+            return NotImplemented
+        return self.op == other.op and self.expr == other.expr
+
+    def __hash__(self):
+        return hash((self.expr, self.op))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memodict=None):
+        return self
 
     def __repr__(self):
         return f"{self.expr} {self.op.value} 0"
@@ -0,0 +1,88 @@
+import ast
+import copy
+
+from src.interpreter.expr_cons import LinearExpr, VariableTable
+from src.interpreter.parser import parse_expr
+
+class ParallelAssign(ast.stmt):
+    """
+    Simultaneous assignment `targets[i] = values[i]` where all the values are
+    evaluated in the state before the statement.
+    """
+    _fields = ('targets', 'values')
+
+def _get_linear_assignment(stmt, var_table):
+    """
+    Returns (var, linexpr) if stmt is a single-target linear assignment, None otherwise.
+    """
+    if not isinstance(stmt, ast.Assign) or len(stmt.targets) != 1 or not isinstance(stmt.targets[0], ast.Name):
+        return None
+
+    try:
+        expr = parse_expr(stmt.value, var_table)
+    except ValueError:
+        return None
+
+    if not isinstance(expr, LinearExpr):
+        return None
+
+    return stmt.targets[0].id, expr
+
+def _make_parallel_assign(run):
+    if len(run) == 1:
+        return run[0]
+
+    fused = ParallelAssign(targets=[stmt.targets[0] for stmt in run], values=[stmt.value for stmt in run])
+    ast.copy_location(fused, run[0])
+    fused.end_lineno = getattr(run[-1], 'end_lineno', None)
+    fused.end_col_offset = getattr(run[-1], 'end_col_offset', None)
+
+    return fused
+
+def _fuse_block(stmts, var_table):
+    fused_stmts = []
+    run = []
+    assigned_in_run = set()
+
+    def flush():
+        if run:
+            fused_stmts.append(_make_parallel_assign(list(run)))
+        run.clear()
+        assigned_in_run.clear()
+
+    for stmt in stmts:
+        assignment = _get_linear_assignment(stmt, var_table)
+
+        if assignment is None:
+            flush()
+            if isinstance(stmt, (ast.If, ast.While)):
+                stmt.body = _fuse_block(stmt.body, var_table)
+                stmt.orelse = _fuse_block(stmt.orelse, var_table)
+            fused_stmts.append(stmt)
+            continue
+
+        var, expr = assignment
+
+        # A parallel assignment evaluates every value in the incoming state, so
+        # the run has to stop before a statement reading (or re-assigning) a
+        # variable written earlier in the run
+        if var in assigned_in_run or assigned_in_run & set(expr.coeffs):
+            flush()
+
+        run.append(stmt)
+        assigned_in_run.add(var)
+
+    flush()
+
+    return fused_stmts
+
+def fuse_statements(func_ast:ast.FunctionDef, var_table:VariableTable = None) -> ast.FunctionDef:
+    """
+    Return a copy of func_ast where every run of consecutive, independent
+    linear assignments is replaced by a single ParallelAssign. The parsed
+    values are interned in var_table.
+    """
+    fused_ast = copy.deepcopy(func_ast)
+    fused_ast.body = _fuse_block(fused_ast.body, var_table)
+
+    return fused_ast
@@ -1,43 +1,56 @@
 import ast
 from src.interpreter.expr_cons import LinearExpr, LinearConstraint, Op
 
-def parse_expr(expr):
+def _parse_terms(expr):
+    """
+    Parse a linear expression into a plain ({var: coeff}, offset) pair. The
+    intermediate sums and products are never interned, only the caller's
+    final expression or constraint is.
+    """
     def walk(node):
         if isinstance(node, ast.BinOp):
             if isinstance(node.op, (ast.Add, ast.Sub)):
-                l = walk(node.left)
-                r = walk(node.right)
-                return LinearExpr.combine(l, r, node.op)
+                coeffs, offset = walk(node.left)
+                r_coeffs, r_offset = walk(node.right)
+                sign = 1 if isinstance(node.op, ast.Add) else -1
+                for var, coeff in r_coeffs.items():
+                    coeffs[var] = coeffs.get(var, 0) + sign * coeff
+                return coeffs, offset + sign * r_offset
 
             elif isinstance(node.op, ast.Mult):
                 left_const = get_constant_value(node.left)
                 right_const = get_constant_value(node.right)
 
                 if left_const is not None:
-                    r = walk(node.right)
-                    return r.scale(left_const)
+                    return scale(walk(node.right), left_const)
                 elif right_const is not None:
-                    l = walk(node.left)
-                    return l.scale(right_const)
+                    return scale(walk(node.left), right_const)
                 else:
                     raise ValueError("Non-linear mult: both sides are variable")
 
         elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
-            operand = walk(node.operand)
-            return operand.scale(-1)
+            return scale(walk(node.operand), -1)
 
         elif isinstance(node, ast.Name):
-            return LinearExpr({node.id: 1}, 0)
+            return {node.id: 1}, 0
 
         elif isinstance(node, (ast.Constant, ast.Num)):
-            return LinearExpr({}, node.n if hasattr(node, 'n') else node.value)
+            value = get_constant_value(node)
+            if value is None:
+                raise ValueError(f"Unsupported constant: {ast.dump(node)}")
+            return {}, value
 
         raise ValueError(f"Unsupported expr: {ast.dump(node)}")
 
+    def scale(terms, factor):
+        coeffs, offset = terms
+        return {var: coeff * factor for var, coeff in coeffs.items()}, offset * factor
+
     def get_constant_value(node):
         """Returns numeric constant value if the node is a constant or -constant."""
         if isinstance(node, (ast.Constant, ast.Num)):
-            return node.n if hasattr(node, 'n') else node.value
+            value = node.n if hasattr(node, 'n') else node.value
+            return value if isinstance(value, (int, float)) else None
         elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
             sub = get_constant_value(node.operand)
             if sub is not None:
@@ -46,12 +59,36 @@ def parse_expr(expr):
 
     return walk(expr)
 
-def parse_cons(node):
+def parse_expr(expr, var_table = None):
+    coeffs, offset = _parse_terms(expr)
+    return LinearExpr(coeffs, offset, var_table)
+
+def parse_cons(node, var_table = None):
     if not isinstance(node, ast.Compare):
         raise ValueError(f"Expected comparison node, got: {type(node).__name__}")
 
-    lhs = parse_expr(node.left)
-    rhs = parse_expr(node.comparators[0])
+    # lhs op rhs  <=>  lhs - rhs op 0
+    coeffs, offset = _parse_terms(node.left)
+    r_coeffs, r_offset = _parse_terms(node.comparators[0])
+    for var, coeff in r_coeffs.items():
+        coeffs[var] = coeffs.get(var, 0) - coeff
     op = Op.from_ast(node.ops[0])
 
-    return LinearConstraint(lhs, op, rhs)
\ No newline at end of file
+    return LinearConstraint.from_expr(LinearExpr(coeffs, offset - r_offset, var_table), op)
+
+def parse_conjunction(node, var_table = None):
+    """
+    Parse a guard into the list of linear constraints it is the conjunction of.
+
+    Besides single comparisons this handles `and` and chained comparisons
+    such as `a <= b < c`.
+    """
+    if isinstance(node, ast.BoolOp) and isinstance(node.op, ast.And):
+        return [cons for value in node.values for cons in parse_conjunction(value, var_table)]
+
+    if isinstance(node, ast.Compare) and len(node.ops) > 1:
+        operands = [node.left] + node.comparators
+        return [parse_cons(ast.Compare(left=operands[i], ops=[op], comparators=[operands[i + 1]]), var_table)
+                for i, op in enumerate(node.ops)]
+
+    return [parse_cons(node, var_table)]
\ No newline at end of file
@@ -0,0 +1,143 @@
+import ast
+import json
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+def get_frame_name(node: ast.AST) -> str:
+    """
+    Name of the profile frame of an AST node, e.g. `While@L4` or `func@L1`.
+    """
+    name = node.name if isinstance(node, ast.FunctionDef) else type(node).__name__
+    return f"{name}@L{node.lineno}"
+
+class AnalysisProfiler:
+    """
+    Attributes the time spent in domain handler calls to the stack of AST
+    nodes (and loop iterations) being analyzed when the call was made.
+
+    Frames are tracked per thread, so the profiler can be shared by the
+    branches of a parallel analysis. The collected times can be exported in
+    the collapsed-stack format of flame graph tools, or as a speedscope profile.
+    """
+    def __init__(self):
+        self._local = threading.local() # Every thread has its own stack of frames
+        self._lock = threading.Lock()
+        self.self_times = defaultdict(float) # Stack of frame names -> seconds
+
+    def reset(self):
+        self._local = threading.local()
+        self.self_times = defaultdict(float)
+
+    @property
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def get_stack(self):
+        return list(self._stack)
+
+    @contextmanager
+    def continue_stack(self, stack):
+        """
+        Continue the stack of another thread, e.g. for work handed to a thread pool.
+        """
+        saved_stack = self._stack
+        self._local.stack = list(stack)
+        try:
+            yield
+        finally:
+            self._local.stack = saved_stack
+
+    @contextmanager
+    def frame(self, name:str):
+        self._stack.append(name)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+
+    def record(self, seconds:float):
+        stack = tuple(self._stack)
+        with self._lock:
+            self.self_times[stack] += seconds
+
+    def _get_weights(self):
+        # Integer microseconds, stacks that took no measurable time are dropped
+        weights = [(stack, round(seconds * 1e6)) for stack, seconds in self.self_times.items()]
+        return [(stack, weight) for stack, weight in weights if weight > 0]
+
+    def to_collapsed(self) -> str:
+        """
+        One `frame1;frame2;...;frameN <microseconds>` line per stack.
+        """
+        return "\n".join(f"{';'.join(stack)} {weight}" for stack, weight in self._get_weights())
+
+    def to_speedscope(self, name:str = "PyAbsInt analysis") -> dict:
+        frames = []
+        frame_ids = dict()
+        samples = []
+        weights = []
+
+        for stack, weight in self._get_weights():
+            sample = []
+            for frame_name in stack:
+                if frame_name not in frame_ids:
+                    frame_ids[frame_name] = len(frames)
+                    frame = {"name": frame_name}
+                    _, _, line = frame_name.rpartition("@L")
+                    if line.isdigit():
+                        frame["line"] = int(line)
+                    frames.append(frame)
+                sample.append(frame_ids[frame_name])
+
+            samples.append(sample)
+            weights.append(weight)
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "exporter": "PyAbsInt",
+            "name": name,
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "microseconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights
+            }]
+        }
+
+    def write_collapsed(self, filename:str):
+        with open(filename, 'w') as file:
+            file.write(self.to_collapsed() + "\n")
+
+    def write_speedscope(self, filename:str, name:str = "PyAbsInt analysis"):
+        with open(filename, 'w') as file:
+            json.dump(self.to_speedscope(name), file)
+
+class ProfiledDomainHandler:
+    """
+    Wraps a domain handler and records the duration of every call into the profiler.
+    """
+    def __init__(self, domain_handler, profiler:AnalysisProfiler):
+        self._domain_handler = domain_handler
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        attr = getattr(self._domain_handler, name)
+        if not callable(attr):
+            return attr
+
+        def timed_call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                self._profiler.record(time.perf_counter() - start)
+
+        return timed_call
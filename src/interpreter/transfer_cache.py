@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, Optional
+
+from src.interpreter.expr_cons import LinearConstraint, LinearExpr
+
+def expr_key(expr: LinearExpr) -> Hashable:
+    """
+    Key of an expression by content, so that it matches the same expression
+    interned in the variable table of another analysis.
+    """
+    return frozenset(expr.coeffs.items()), expr.offset
+
+def cons_key(lincons: LinearConstraint) -> Hashable:
+    return expr_key(lincons.expr), lincons.op
+
+class TransferCache:
+    """
+    LRU cache from (domain handler, transfer function, input state
+    fingerprints) to the resulting state, bounded by the approximate size of
+    the cached states.
+
+    The cache can be shared by several analyses, e.g. of similar functions or
+    of the stages of a cascade.
+    hits, misses and hit_rate report its effectiveness.
+
+    Every transfer then pays for fingerprinting its inputs, so the cache only
+    pays off when transfers are applied to the same states again, e.g. when
+    the same function is analyzed repeatedly, see benchmarks/transfer_cache.py.
+    The engine only stores the results of transfers that took longer than
+    the lookup did.
+    """
+    def __init__(self, max_bytes:int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # Key -> (value, nbytes), least recently used first
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, is_valid:Optional[Callable] = None):
+        """
+        Cached value of key, None on a miss. is_valid can reject a cached
+        value, e.g. when the key does not identify the inputs exactly.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is not None and (is_valid is None or is_valid(entry[0])):
+            with self._lock:
+                self.hits += 1
+            return entry[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, value, nbytes:int):
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self.nbytes -= old_entry[1]
+
+            self._entries[key] = (value, nbytes)
+            self.nbytes += nbytes
+
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_nbytes) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
@@ -1,4 +1,6 @@
 import ast
+import tokenize
+from typing import Iterator, List, Tuple
 
 def read_code_from_file(filename: str) -> str:
     with open(filename, 'r') as file:
@@ -12,9 +14,113 @@ def get_function_ast(code_text: str, func_name: str) -> ast.FunctionDef:
     
     Raises ValueError if function is not found.
     """
-    parsed = ast.parse(code_text)
-    for node in ast.walk(parsed):
-        if isinstance(node, ast.FunctionDef) and node.name == func_name:
-            return node
+    return get_function_asts(code_text, [func_name])[0]
 
-    raise ValueError(f"Function '{func_name}' not found in code.")
\ No newline at end of file
+def get_function_asts(code_text: str, func_names: List[str]) -> List[ast.FunctionDef]:
+    """
+    Parse code_text once and return the AST nodes for the functions named
+    func_names, in the same order.
+
+    Raises ValueError if a function is not found.
+    """
+    wanted = set(func_names)
+    func_asts = dict()
+    for node in ast.walk(ast.parse(code_text)):
+        if isinstance(node, ast.FunctionDef) and node.name in wanted and node.name not in func_asts:
+            func_asts[node.name] = node
+
+    for func_name in func_names:
+        if func_name not in func_asts:
+            raise ValueError(f"Function '{func_name}' not found in code.")
+
+    return [func_asts[func_name] for func_name in func_names]
+
+def iter_function_sources(filename: str) -> Iterator[Tuple[str, int, str]]:
+    """
+    Yield (name, first line, source) for every top-level function of the
+    file, decorators included, in order.
+
+    The file is tokenized line by line and only the lines of the current
+    function are kept, so memory is bounded by the largest function rather
+    than by the file. Other top-level statements are skipped.
+
+    Tokenizing stops at the first tokenizer error, the function it occurs in
+    is still yielded and fails to parse.
+    """
+    with open(filename, 'r') as file:
+        lines = [] # Lines read from first_row on
+        first_row = 1
+
+        def readline():
+            line = file.readline()
+            if line:
+                lines.append(line)
+            return line
+
+        def take_lines(end_row):
+            # Pop the lines before end_row
+            nonlocal first_row
+            taken = lines[:end_row - first_row]
+            del lines[:end_row - first_row]
+            first_row = end_row
+            return taken
+
+        depth = 0
+        at_stmt_start = True
+        function_name = None
+        function_start = None # First row of the current function, None outside of functions
+        decorator_start = None
+        expect_name = False
+
+        try:
+            for token in tokenize.generate_tokens(readline):
+                if token.type == tokenize.INDENT:
+                    depth += 1
+                elif token.type == tokenize.DEDENT:
+                    depth -= 1
+                elif token.type == tokenize.NEWLINE:
+                    at_stmt_start = True
+                elif token.type == tokenize.ENDMARKER:
+                    if function_start is not None:
+                        yield function_name, function_start, "".join(take_lines(token.start[0] + 1))
+                elif expect_name and token.type == tokenize.NAME and token.string not in ("async", "def"):
+                    function_name = token.string
+                    expect_name = False
+                elif at_stmt_start and token.type not in (tokenize.NL, tokenize.COMMENT):
+                    at_stmt_start = False
+                    if depth > 0:
+                        continue
+
+                    # A new top-level statement ends the previous function
+                    row = token.start[0]
+                    is_def = token.type == tokenize.NAME and token.string in ("async", "def")
+                    is_decorator = token.type == tokenize.OP and token.string == "@"
+                    if decorator_start is None or not (is_def or is_decorator):
+                        if function_start is not None:
+                            yield function_name, function_start, "".join(take_lines(row))
+                        take_lines(row)
+                        function_start = None
+
+                    if is_decorator:
+                        decorator_start = decorator_start or row
+                    elif is_def:
+                        function_start = decorator_start or row
+                        decorator_start = None
+                        expect_name = True
+                    else:
+                        decorator_start = None
+        except (tokenize.TokenError, IndentationError):
+            # The rest of the file cannot be split, e.g. after an unclosed
+            # bracket. The current function gets the rest of the file, so that
+            # parsing it reports the error for that function.
+            if function_start is not None:
+                lines.extend(file.readlines())
+                yield function_name, function_start, "".join(lines)
+
+def parse_function_source(source: str, first_line: int) -> ast.FunctionDef:
+    """
+    Parse the source of one function yielded by iter_function_sources, with
+    line numbers relative to the whole file.
+    """
+    func_ast = ast.parse(source).body[0]
+    return ast.increment_lineno(func_ast, first_line - 1)
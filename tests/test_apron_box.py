@@ -95,5 +95,88 @@ class TestApronBox(unittest.TestCase):
         final_state = self.abs_interpreter.execute(filename, funcname, initial_env)
         self._compare_states(expected_output_env, final_state)
 
+    def test_5_assertions(self):
+        filename = self.test_programs_folder + "t5.py"
+        funcname = "func"
+        initial_env = {
+            'x': (0, 5),
+            'y': (0, 5)
+        }
+
+        # Boxes cannot relate a and b, so only the bound on a is proved
+        expected_proved = {
+            4: False,
+            5: True
+        }
+
+        self.abs_interpreter.execute(filename, funcname, initial_env)
+        proved = {r.lineno: r.proved for r in self.abs_interpreter.assertion_results.values()}
+        self.assertEqual(expected_proved, proved)
+
+    def test_6_loop_acceleration(self):
+        filename = self.test_programs_folder + "t6.py"
+        funcname = "func"
+        initial_env = {
+            'x': (0, 5),
+            'y': (0, 5)
+        }
+
+        # The closed form gives the exact exit value of the counter, and with it
+        # the 17 increments of x, no widening involved
+        expected_output_env = {
+            'x': (34, 39),
+            'y': (0, 5),
+            'c': (17, 17),
+        }
+
+        accelerated_config = AbstractInterpreterConfig(domain_handler=self.box_handler, loop_acceleration=True)
+        final_state = AbstractInterpreter(accelerated_config).execute(filename, funcname, initial_env)
+        self._compare_states(expected_output_env, final_state)
+
+    def test_statement_fusion(self):
+        # Fused assignments and guards must give the same result as the plain analysis
+        fused_config = AbstractInterpreterConfig(domain_handler=self.box_handler, statement_fusion=True)
+        fused_interpreter = AbstractInterpreter(fused_config)
+        initial_env = {
+            'x': (0, 5),
+            'y': (0, 5)
+        }
+
+        for program in ["t1.py", "t2.py", "t3.py", "t4.py"]:
+            filename = self.test_programs_folder + program
+            expected_state = self.abs_interpreter.execute(filename, "func", initial_env)
+            fused_state = fused_interpreter.execute(filename, "func", initial_env)
+            self.assertTrue(self.box_handler.are_states_equal(expected_state, fused_state), f"Fusion changed the result of {program}")
+
+    def test_constant_propagation(self):
+        # Folding the leading constants into the initial state must not change the result
+        folded_config = AbstractInterpreterConfig(domain_handler=self.box_handler, constant_propagation=True)
+        folded_interpreter = AbstractInterpreter(folded_config)
+        initial_env = {
+            'x': (0, 5),
+            'y': (0, 5)
+        }
+
+        for program in ["t1.py", "t2.py", "t3.py", "t4.py"]:
+            filename = self.test_programs_folder + program
+            expected_state = self.abs_interpreter.execute(filename, "func", initial_env)
+            folded_state = folded_interpreter.execute(filename, "func", initial_env)
+            self.assertTrue(self.box_handler.are_states_equal(expected_state, folded_state), f"Constant propagation changed the result of {program}")
+
+    def test_parallel_branches(self):
+        # Branches analyzed on the thread pool must join to the sequential result
+        parallel_config = AbstractInterpreterConfig(domain_handler=self.box_handler, parallel_branches=True, parallel_min_vars=0)
+        initial_env = {
+            'x': (0, 5),
+            'y': (0, 5)
+        }
+
+        with AbstractInterpreter(parallel_config) as parallel_interpreter:
+            for program in ["t1.py", "t2.py"]:
+                filename = self.test_programs_folder + program
+                expected_state = self.abs_interpreter.execute(filename, "func", initial_env)
+                parallel_state = parallel_interpreter.execute(filename, "func", initial_env)
+                self.assertTrue(self.box_handler.are_states_equal(expected_state, parallel_state), f"Parallel branches changed the result of {program}")
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,73 @@
+import ast
+import unittest
+from unittest import mock
+
+from src.abstract_domains.dbm_handler import DbmDomainHandler
+from src.interpreter.cascade import CascadeAnalyzer, CascadeStage
+
+class IntervalZonesHandler(DbmDomainHandler):
+    """
+    Zones that only keep the variable bounds after an assignment, as precise as boxes.
+    """
+    def __init__(self):
+        super().__init__("zones")
+
+    def assign_linexpr(self, state, var, linexpr):
+        super().assign_linexpr(state, var, linexpr)
+        if state.matrix is not None:
+            # Row and column 0 hold the bounds, everything else is a relation
+            bounds = self._top_matrix(len(state.var_dim_map))
+            bounds[0, :] = state.matrix[0, :]
+            bounds[:, 0] = state.matrix[:, 0]
+            state.matrix = self._closure(bounds)
+
+class TestCascade(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.test_programs_folder = "../programs/"
+        self.initial_env = {
+            'x': (0, 5),
+            'y': (0, 5)
+        }
+
+    def test_proved_by(self):
+        oct_handler = DbmDomainHandler("oct")
+        stages = [
+            CascadeStage("intervals", IntervalZonesHandler()),
+            CascadeStage("zones", DbmDomainHandler("zones")),
+            CascadeStage("oct", oct_handler)
+        ]
+
+        with mock.patch.object(oct_handler, 'get_init_state', wraps=oct_handler.get_init_state) as oct_init:
+            reports = CascadeAnalyzer(stages).execute(self.test_programs_folder + "t5.py", ["func"], self.initial_env)
+
+            # Everything is proved after the zones stage, the octagons are never run
+            oct_init.assert_not_called()
+
+        proved_by = {report.lineno: report.proved_by for report in reports}
+        self.assertEqual({4: "zones", 5: "intervals"}, proved_by)
+        self.assertTrue(all(report.proved for report in reports))
+        self.assertEqual(["func", "func"], [report.function_name for report in reports])
+
+    def test_unproved(self):
+        # A single stage that cannot relate a and b leaves line 4 unproved
+        stages = [CascadeStage("intervals", IntervalZonesHandler())]
+        reports = CascadeAnalyzer(stages).execute(self.test_programs_folder + "t5.py", ["func"], self.initial_env)
+
+        self.assertEqual({4: None, 5: "intervals"}, {report.lineno: report.proved_by for report in reports})
+        self.assertFalse(reports[0].proved)
+
+    def test_module_parsed_once(self):
+        # Every function and every stage reuse the same parse of the module
+        stages = [CascadeStage("intervals", IntervalZonesHandler()), CascadeStage("zones", DbmDomainHandler("zones"))]
+        with mock.patch("src.utils.ast.parse", wraps=ast.parse) as parse:
+            reports = CascadeAnalyzer(stages).execute(self.test_programs_folder + "t5.py", ["func", "func"], self.initial_env)
+
+        parse.assert_called_once()
+        self.assertEqual(4, len(reports))
+
+        with self.assertRaises(ValueError):
+            CascadeAnalyzer(stages).execute(self.test_programs_folder + "t5.py", ["func", "missing"], self.initial_env)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,218 @@
+import ast
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.abstract_domains.dbm_handler import DbmDomainHandler
+from src.interpreter.engine import AbstractInterpreterConfig, AbstractInterpreter
+from src.interpreter.expr_cons import LinearConstraint, LinearExpr, Op
+from src.interpreter.fusion import ParallelAssign, fuse_statements
+
+# Independent assignments fused into ParallelAssigns, under `and` and
+# chained guards whose else branch and loop exit meet their negation
+FUSED_GUARDS_SOURCE = """def func(x, y):
+    a = x + 1
+    b = a + y
+    if 0 <= y <= 10 and x >= 2:
+        c = a - 1
+        d = b
+        assert c >= 2
+    else:
+        c = x
+        d = y + 1
+        assert x <= 1
+    i = 0
+    j = 0
+    while i < 10 and j < 5:
+        i = i + 1
+        j = j + 1
+    assert j >= 5
+"""
+
+class TestDbm(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.test_programs_folder = "../programs/"
+        self.handlers = {
+            "zones": DbmDomainHandler("zones"),
+            "oct": DbmDomainHandler("oct")
+        }
+        self.initial_env = {
+            'x': (0, 5),
+            'y': (0, 5)
+        }
+
+    def _execute(self, domain_name, program, **config_flags):
+        config = AbstractInterpreterConfig(domain_handler=self.handlers[domain_name], **config_flags)
+        abs_interpreter = AbstractInterpreter(config)
+        final_state = abs_interpreter.execute(self.test_programs_folder + program, "func", self.initial_env)
+        return abs_interpreter, final_state
+
+    def _compare_states(self, domain_name, expected_env, output):
+        handler = self.handlers[domain_name]
+        self.assertEqual(set(expected_env.keys()), set(output.var_dim_map.keys()), "Output and expected ans have different keys")
+
+        matrix = handler._closed_matrix(output)
+        for k in expected_env:
+            bounds = handler._get_bounds(matrix, output.var_dim_map[k])
+            self.assertEqual(expected_env[k], bounds, f"For {k} in {domain_name}, {expected_env[k]} != {bounds}")
+
+    def test_1(self):
+        expected_output_envs = {
+            "zones": {'x': (0, 5), 'y': (0, 5), 'a': (0, 10), 'b': (-5, 5), 'c': (-5, 15), 'd': (2, 2)},
+            # The octagon keeps b - x <= 0 and b + y >= 0, hence the tighter bounds of c
+            "oct": {'x': (0, 5), 'y': (0, 5), 'a': (0, 10), 'b': (-5, 5), 'c': (-2, 12), 'd': (2, 2)}
+        }
+
+        for domain_name, expected_output_env in expected_output_envs.items():
+            _, final_state = self._execute(domain_name, "t1.py")
+            self._compare_states(domain_name, expected_output_env, final_state)
+
+    def test_3(self):
+        expected_output_env = {
+            'x': (1, float('inf')),
+            'y': (33, float('inf'))
+        }
+
+        for domain_name in self.handlers:
+            _, final_state = self._execute(domain_name, "t3.py")
+            self._compare_states(domain_name, expected_output_env, final_state)
+
+    def test_5_assertions(self):
+        # Unlike boxes, both domains keep b - a = 1 and prove both assertions
+        for domain_name in self.handlers:
+            abs_interpreter, _ = self._execute(domain_name, "t5.py")
+            proved = {r.lineno: r.proved for r in abs_interpreter.assertion_results.values()}
+            self.assertEqual({4: True, 5: True}, proved)
+
+    def test_6(self):
+        # x - c >= 0 holds in the loop, so x >= 17 after it
+        expected_output_env = {
+            'x': (17, float('inf')),
+            'y': (0, 5),
+            'c': (17, float('inf'))
+        }
+
+        for domain_name in self.handlers:
+            _, final_state = self._execute(domain_name, "t6.py")
+            self._compare_states(domain_name, expected_output_env, final_state)
+
+    def test_6_loop_acceleration(self):
+        # n = 17 is known before the increments are applied, so x gets exactly 2 * 17 added
+        expected_output_env = {
+            'x': (34, 39),
+            'y': (0, 5),
+            'c': (17, 17)
+        }
+
+        for domain_name in self.handlers:
+            _, final_state = self._execute(domain_name, "t6.py", loop_acceleration=True)
+            self._compare_states(domain_name, expected_output_env, final_state)
+
+    def test_incremental_closure(self):
+        # Meeting a constraint must give the same matrix as a full closure
+        for domain_name, handler in self.handlers.items():
+            state = handler.get_init_state({'x': (0, 10), 'y': (0, 10), 'z': (0, 10)})
+            x_minus_y = LinearExpr({'x': 1, 'y': -1}, 0)
+            handler.meet_lincons(state, LinearConstraint(x_minus_y, Op.LE, LinearExpr({}, -2)))
+            handler.meet_lincons(state, LinearConstraint(LinearExpr({'y': 1, 'z': -1}, 0), Op.LT, LinearExpr({}, 0)))
+
+            np.testing.assert_array_equal(handler._closure(state.matrix), state.matrix)
+            # x <= y - 2 <= z - 3 <= 7
+            self.assertEqual((0, 7), handler._get_bounds(state.matrix, state.var_dim_map['x']))
+
+            # The constraints are now contradictory
+            handler.meet_lincons(state, LinearConstraint(LinearExpr({'x': 1}, 0), Op.GE, LinearExpr({'z': 1}, 0)))
+            self.assertTrue(handler.is_bottom(state))
+
+    def test_parallel_branches(self):
+        forks = []
+        class ForkingHandler(DbmDomainHandler):
+            def fork(self):
+                handler = DbmDomainHandler(self.dbm_domain.value)
+                handler.close = mock.Mock()
+                forks.append(handler)
+                return handler
+
+        config = AbstractInterpreterConfig(domain_handler=ForkingHandler("zones"), parallel_branches=True,
+                                           parallel_workers=2, parallel_min_vars=0)
+        with AbstractInterpreter(config) as abs_interpreter:
+            for program in ["t1.py", "t2.py", "t1.py"]:
+                parallel_state = abs_interpreter.execute(self.test_programs_folder + program, "func", self.initial_env)
+                _, expected_state = self._execute("zones", program)
+                self.assertTrue(self.handlers["zones"].are_states_equal(expected_state, parallel_state))
+
+            # Runs share the pool, so there is at most one fork per worker thread
+            self.assertTrue(1 <= len(forks) <= 2)
+
+        # Leaving the with block shut the pool down and released the forks
+        self.assertIsNone(abs_interpreter._executor)
+        for fork in forks:
+            fork.close.assert_called_once_with()
+
+    def test_statement_fusion(self):
+        # Fused assignments and guards must give the same result as the plain analysis
+        for domain_name, handler in self.handlers.items():
+            for program in ["t1.py", "t2.py", "t3.py", "t4.py"]:
+                _, expected_state = self._execute(domain_name, program)
+                _, fused_state = self._execute(domain_name, program, statement_fusion=True)
+                self.assertTrue(handler.are_states_equal(expected_state, fused_state), f"Fusion changed the result of {program} in {domain_name}")
+
+    def test_statement_fusion_guards(self):
+        func_ast = ast.parse(FUSED_GUARDS_SOURCE).body[0]
+        fused_ast = fuse_statements(func_ast)
+        if_stmt, _, while_stmt, _ = fused_ast.body[2:]
+        self.assertIsInstance(if_stmt.body[0], ParallelAssign)
+        self.assertIsInstance(if_stmt.orelse[0], ParallelAssign)
+        self.assertIsInstance(while_stmt.body[0], ParallelAssign)
+
+        for domain_name, handler in self.handlers.items():
+            results = dict()
+            for statement_fusion in [False, True]:
+                config = AbstractInterpreterConfig(domain_handler=handler, statement_fusion=statement_fusion)
+                abs_interpreter = AbstractInterpreter(config)
+                final_state = abs_interpreter.execute_on_ast(func_ast, self.initial_env)
+                results[statement_fusion] = final_state
+
+                # The else branch only keeps x <= 1, the other negated constraints are
+                # contradictory, and the loop exits with j >= 5
+                self.assertEqual({7: True, 11: True, 17: True}, {r.lineno: r.proved for r in abs_interpreter.assertion_results.values()})
+
+            self.assertTrue(handler.are_states_equal(results[False], results[True]), f"Fusion changed the result in {domain_name}")
+            self.assertEqual([5, None], handler.state_to_json(results[True])['j'])
+
+    def test_meet_negation(self):
+        abs_interpreter = AbstractInterpreter(AbstractInterpreterConfig(domain_handler=self.handlers["zones"]))
+        handler = abs_interpreter.domain_handler
+        x = LinearExpr({'x': 1}, 0)
+        conditions = [LinearConstraint(x, Op.GE, LinearExpr({}, 2)), LinearConstraint(x, Op.LE, LinearExpr({}, 3))]
+
+        # !(x >= 2 and x <= 3) is x <= 1 or x >= 4
+        state = abs_interpreter._meet_negation(handler.get_init_state({'x': (0, 5)}), conditions)
+        self.assertEqual({'x': [0, 5]}, handler.state_to_json(state))
+
+        # x >= 4 is contradictory, the join keeps x <= 1 only
+        state = abs_interpreter._meet_negation(handler.get_init_state({'x': (0, 3)}), conditions)
+        self.assertEqual({'x': [0, 1]}, handler.state_to_json(state))
+
+        # Both disjuncts are contradictory
+        state = abs_interpreter._meet_negation(handler.get_init_state({'x': (2, 3)}), conditions)
+        self.assertTrue(handler.is_bottom(state))
+
+    def test_environment_changes(self):
+        for domain_name, handler in self.handlers.items():
+            state1 = handler.get_init_state({'x': (0, 1)})
+            state2 = handler.get_init_state({'y': (2, 3), 'x': (4, 5)})
+
+            # Joins are over the union of the variables
+            joined_state = handler.join(state1, state2)
+            self.assertEqual((0, 5), handler._get_bounds(joined_state.matrix, joined_state.var_dim_map['x']))
+            self.assertEqual((-float('inf'), float('inf')), handler._get_bounds(joined_state.matrix, joined_state.var_dim_map['y']))
+
+            handler.remove_var(state2, 'y')
+            self.assertEqual(1, handler.state_size(state2))
+            self.assertTrue(handler.are_states_equal(state2, handler.get_init_state({'x': (4, 5)})))
+
+if __name__ == "__main__":
+    unittest.main()
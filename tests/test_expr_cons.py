@@ -0,0 +1,102 @@
+import ast
+import unittest
+
+from src.interpreter.expr_cons import LinearConstraint, LinearExpr, Op, VariableTable
+from src.interpreter.const_prop import propagate_constants
+from src.interpreter.fusion import fuse_statements
+from src.interpreter.parser import parse_expr
+
+class TestExprCons(unittest.TestCase):
+    def setUp(self):
+        self.table = VariableTable()
+
+    def test_equal_exprs_are_interned(self):
+        expr1 = LinearExpr({'x': 1, 'y': 2}, 3, self.table)
+        expr2 = LinearExpr({'y': 2, 'x': 1}, 3, self.table)
+        self.assertIs(expr1, expr2)
+
+        # Zero coefficients do not change the expression
+        expr3 = LinearExpr({'x': 1, 'y': 2, 'z': 0}, 3, self.table)
+        self.assertIs(expr1, expr3)
+
+    def test_parsed_exprs_are_interned(self):
+        expr1 = parse_expr(ast.parse("x + 2*y - x + x", mode="eval").body, self.table)
+        expr2 = parse_expr(ast.parse("2*y + x", mode="eval").body, self.table)
+        self.assertIs(expr1, expr2)
+        self.assertEqual({'x': 1, 'y': 2}, dict(expr1.coeffs))
+        self.assertEqual(0, expr1.offset)
+
+    def test_combine_and_scale(self):
+        x = LinearExpr({'x': 1}, 0, self.table)
+        y = LinearExpr({'y': 1}, 1, self.table)
+        diff = LinearExpr.combine(x, y, ast.Sub())
+        self.assertIs(LinearExpr({'x': 1, 'y': -1}, -1, self.table), diff)
+        self.assertIs(LinearExpr({'x': -2, 'y': 2}, 2, self.table), diff.scale(-2))
+
+        # Constants built without a table join the table of the other operand
+        shifted = LinearExpr.combine(LinearExpr({}, 5), x, ast.Add())
+        self.assertIs(self.table, shifted.table)
+        self.assertIs(LinearExpr({'x': 1}, 5, self.table), shifted)
+
+    def test_immutable(self):
+        expr = LinearExpr({'x': 1}, 0, self.table)
+        lincons = LinearConstraint(expr, Op.LE, LinearExpr({}, 4, self.table))
+
+        with self.assertRaises(AttributeError):
+            expr.offset = 1
+        with self.assertRaises(AttributeError):
+            lincons.op = Op.GT
+        with self.assertRaises(TypeError):
+            expr.coeffs['x'] = 2
+
+    def test_constraints_are_interned(self):
+        x = LinearExpr({'x': 1}, 0, self.table)
+        lincons = LinearConstraint(x, Op.LE, LinearExpr({}, 4, self.table))
+
+        self.assertIs(lincons, LinearConstraint(x, Op.LE, LinearExpr({}, 4, self.table)))
+        self.assertIs(lincons, lincons.negate().negate())
+        self.assertEqual(Op.GT, lincons.negate().op)
+        self.assertEqual(Op.LE, lincons.op)
+
+    def test_tighten(self):
+        x = LinearExpr({'x': 1}, 0, self.table)
+        lincons = LinearConstraint(x, Op.LT, LinearExpr({}, 4, self.table))
+        self.assertIs(LinearConstraint(x, Op.LE, LinearExpr({}, 3, self.table)), lincons.tighten())
+
+    def test_numeric_types_are_kept(self):
+        # 1 == 1.0 == True, but an integer offset must not come back as a float
+        float_expr = LinearExpr({'x': 1.0}, 1.0, self.table)
+        int_expr = LinearExpr({'x': 1}, 1, self.table)
+        self.assertIsNot(float_expr, int_expr)
+        self.assertIs(int, type(int_expr.offset))
+        self.assertIs(int, type(int_expr.coeffs['x']))
+
+        float_cons = LinearConstraint.from_expr(float_expr, Op.LE)
+        self.assertIs(int, type(LinearConstraint.from_expr(int_expr, Op.LE).expr.offset))
+        self.assertIs(float, type(float_cons.expr.offset))
+
+    def test_equality_across_tables(self):
+        expr = LinearExpr({'x': 1, 'y': 2}, 3, self.table)
+        other_expr = LinearExpr({'y': 2, 'x': 1}, 3, VariableTable())
+        self.assertEqual(expr, other_expr)
+        self.assertEqual(hash(expr), hash(other_expr))
+        self.assertEqual(expr, LinearExpr({'x': 1, 'y': 2}, 3))
+        self.assertNotEqual(expr, LinearExpr({'x': 1, 'y': 2}, 4, self.table))
+
+        lincons = LinearConstraint.from_expr(expr, Op.LE)
+        self.assertEqual(lincons, LinearConstraint.from_expr(other_expr, Op.LE))
+        self.assertNotEqual(lincons, LinearConstraint.from_expr(other_expr, Op.LT))
+
+    def test_pre_passes_use_the_given_table(self):
+        func_ast = ast.parse("def f(x):\n    a = 1\n    b = x + a\n    c = b\n").body[0]
+        folded_ast, _ = propagate_constants(func_ast, self.table)
+        fuse_statements(folded_ast, self.table)
+        self.assertEqual({'x', 'b'}, {v for v in ('x', 'a', 'b', 'c') if v in self.table})
+
+        # Without a table, every expression gets its own instead of a shared global one
+        expr = parse_expr(ast.parse("y + 1", mode="eval").body)
+        self.assertIsNot(self.table, expr.table)
+        self.assertNotIn('y', LinearExpr({'z': 1}, 0).table)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+import unittest
+
+from src.abstract_domains.dbm_handler import DbmDomainHandler
+from src.interpreter.engine import AbstractInterpreterConfig, AbstractInterpreter
+from src.interpreter.profiler import AnalysisProfiler, ProfiledDomainHandler
+
+class TestProfiler(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.test_programs_folder = "../programs/"
+        self.initial_env = {
+            'x': (0, 5),
+            'y': (0, 5)
+        }
+
+    def _profile(self, program):
+        profiler = AnalysisProfiler()
+        config = AbstractInterpreterConfig(domain_handler=DbmDomainHandler("zones"), profiler=profiler)
+        AbstractInterpreter(config).execute(self.test_programs_folder + program, "func", self.initial_env)
+        return profiler
+
+    def test_stacks(self):
+        profiler = self._profile("t4.py")
+        stacks = {";".join(stack) for stack in profiler.self_times}
+
+        self.assertIn("init_state", stacks)
+        self.assertIn("func@L1;Assign@L2", stacks)
+        self.assertIn("func@L1;While@L5;iteration 1;Assign@L6", stacks)
+        self.assertIn("func@L1;While@L5;iteration 2;Assign@L9", stacks)
+
+        # One "<stack> <microseconds>" line per stack that took measurable time
+        for line in profiler.to_collapsed().splitlines():
+            stack, weight = line.rsplit(" ", 1)
+            self.assertIn(stack, stacks)
+            self.assertGreater(int(weight), 0)
+
+    def test_speedscope(self):
+        profiler = self._profile("t4.py")
+        speedscope = profiler.to_speedscope("t4")
+
+        frames = speedscope["shared"]["frames"]
+        profile, = speedscope["profiles"]
+        self.assertEqual("sampled", profile["type"])
+        self.assertEqual(len(profile["samples"]), len(profile["weights"]))
+        self.assertEqual(sum(profile["weights"]), profile["endValue"])
+
+        # Every sample is a stack of frame indices, statement frames carry their line
+        for sample in profile["samples"]:
+            self.assertTrue(all(0 <= frame_id < len(frames) for frame_id in sample))
+        self.assertIn({"name": "While@L5", "line": 5}, frames)
+        self.assertIn({"name": "iteration 1"}, frames)
+
+    def test_write(self):
+        profiler = self._profile("t1.py")
+
+        with tempfile.TemporaryDirectory() as folder:
+            collapsed_filename = os.path.join(folder, "profile.folded")
+            speedscope_filename = os.path.join(folder, "profile.speedscope.json")
+            profiler.write_collapsed(collapsed_filename)
+            profiler.write_speedscope(speedscope_filename, "t1")
+
+            with open(collapsed_filename) as file:
+                self.assertEqual(profiler.to_collapsed() + "\n", file.read())
+            with open(speedscope_filename) as file:
+                self.assertEqual(profiler.to_speedscope("t1"), json.load(file))
+
+    def test_profiled_domain_handler(self):
+        profiler = AnalysisProfiler()
+        handler = DbmDomainHandler("oct")
+        profiled_handler = ProfiledDomainHandler(handler, profiler)
+
+        # Calls are forwarded and timed under the current stack, attributes are passed through
+        with profiler.frame("outer"):
+            state = profiled_handler.get_init_state({'x': (0, 1)})
+        self.assertEqual(1, profiled_handler.state_size(state))
+        self.assertIs(handler.dbm_domain, profiled_handler.dbm_domain)
+
+        self.assertEqual({("outer",), ()}, set(profiler.self_times))
+        self.assertTrue(all(seconds > 0 for seconds in profiler.self_times.values()))
+
+if __name__ == "__main__":
+    unittest.main()
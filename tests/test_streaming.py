@@ -0,0 +1,134 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from src.abstract_domains.dbm_handler import DbmDomainHandler
+from src.interpreter.engine import AbstractInterpreterConfig, AbstractInterpreter
+from src.utils import iter_function_sources, parse_function_source
+
+MODULE_SOURCE = '''import os
+X = 3
+
+TEMPLATE = """
+def g():
+"""
+def f(x, y):
+    a = x + 1
+# Comment between functions
+
+@decorator
+@other_decorator(
+    1)
+def g(x, y):
+    return x
+
+class C:
+    def method(self):
+        pass
+
+def h(x, y):
+    b = x
+    assert b >= 0
+
+def unpack(x, y):
+    a, b = 1, 2
+
+def attribute(x, y):
+    x.attr = 1
+
+def text(x, y):
+    s = 'abc'
+
+def broken(x, y):
+    return x +
+
+def last(x, y):
+    c = y
+'''
+
+class TestStreaming(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.initial_env = {
+            'x': (0, 5),
+            'y': (0, 5)
+        }
+
+    def setUp(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as file:
+            file.write(MODULE_SOURCE)
+            self.module_filename = file.name
+
+    def tearDown(self):
+        os.remove(self.module_filename)
+
+    def test_function_sources(self):
+        sources = list(iter_function_sources(self.module_filename))
+        self.assertEqual(['f', 'g', 'h', 'unpack', 'attribute', 'text', 'broken', 'last'], [name for name, _, _ in sources])
+
+        # Decorators belong to the function, line numbers are those of the file
+        name, first_line, source = sources[1]
+        self.assertEqual(11, first_line)
+        self.assertTrue(source.startswith("@decorator\n"))
+        self.assertEqual(14, parse_function_source(source, first_line).lineno)
+
+    def test_execute_stream(self):
+        abs_interpreter = AbstractInterpreter(AbstractInterpreterConfig(domain_handler=DbmDomainHandler("zones")))
+        out_file = io.StringIO()
+
+        written = abs_interpreter.execute_stream(self.module_filename, out_file, self.initial_env, function_names=['f', 'h'])
+        results = [json.loads(line) for line in out_file.getvalue().splitlines()]
+
+        self.assertEqual(2, written)
+        self.assertEqual({'a': [1, 6], 'x': [0, 5], 'y': [0, 5]}, results[0]["state"])
+        self.assertEqual(21, results[1]["lineno"])
+        self.assertEqual([{'lineno': 23, 'col_offset': 4, 'condition': 'b >= 0', 'proved': True}], results[1]["assertions"])
+
+    def test_execute_stream_error(self):
+        # Unsupported statements are reported on the line of their function
+        abs_interpreter = AbstractInterpreter(AbstractInterpreterConfig(domain_handler=DbmDomainHandler("zones")))
+        out_file = io.StringIO()
+
+        abs_interpreter.execute_stream(self.module_filename, out_file, self.initial_env, function_names=['g'])
+        result = json.loads(out_file.getvalue())
+        self.assertEqual('g', result["function"])
+        self.assertIn("error", result)
+
+    def test_execute_stream_unsupported(self):
+        # Each failing function gets its error line, the analysis goes on with the next one
+        abs_interpreter = AbstractInterpreter(AbstractInterpreterConfig(domain_handler=DbmDomainHandler("zones")))
+        out_file = io.StringIO()
+
+        function_names = ['unpack', 'attribute', 'text', 'broken', 'last']
+        written = abs_interpreter.execute_stream(self.module_filename, out_file, self.initial_env, function_names)
+        results = [json.loads(line) for line in out_file.getvalue().splitlines()]
+
+        self.assertEqual(5, written)
+        self.assertEqual(function_names, [result["function"] for result in results])
+        errors = [result["error"].split(":")[0] for result in results[:4]]
+        self.assertEqual(["NotImplementedError", "NotImplementedError", "ValueError", "SyntaxError"], errors)
+        self.assertEqual(34, results[3]["lineno"])
+        self.assertEqual([0, 5], results[4]["state"]["c"])
+
+    def test_execute_stream_token_error(self):
+        # The unclosed bracket swallows the rest of the file, the functions
+        # before it are still analyzed
+        with open(self.module_filename, 'w') as file:
+            file.write("def f(x, y):\n    a = x + 1\n\ndef unclosed(x, y):\n    a = (x +\n\ndef g(x, y):\n    b = y\n")
+
+        self.assertEqual(['f', 'unclosed'], [name for name, _, _ in iter_function_sources(self.module_filename)])
+
+        abs_interpreter = AbstractInterpreter(AbstractInterpreterConfig(domain_handler=DbmDomainHandler("zones")))
+        out_file = io.StringIO()
+        written = abs_interpreter.execute_stream(self.module_filename, out_file, self.initial_env)
+        results = [json.loads(line) for line in out_file.getvalue().splitlines()]
+
+        self.assertEqual(2, written)
+        self.assertEqual([1, 6], results[0]["state"]["a"])
+        self.assertEqual(4, results[1]["lineno"])
+        self.assertTrue(results[1]["error"].startswith("SyntaxError"))
+
+if __name__ == "__main__":
+    unittest.main()
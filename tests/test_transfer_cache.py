@@ -0,0 +1,79 @@
+import ast
+import math
+import unittest
+import warnings
+from dataclasses import replace
+
+from src.abstract_domains.dbm_handler import DbmDomainHandler
+from src.interpreter.engine import AbstractInterpreterConfig, AbstractInterpreter
+from src.interpreter.transfer_cache import TransferCache
+
+class TestTransferCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.test_programs_folder = "../programs/"
+        self.dbm_handler = DbmDomainHandler("oct")
+        self.initial_env = {
+            'x': (0, 5),
+            'y': (0, 5)
+        }
+
+    def test_lru_eviction(self):
+        cache = TransferCache(max_bytes=100)
+        cache.put('a', 1, 40)
+        cache.put('b', 2, 40)
+        self.assertEqual(1, cache.get('a'))
+
+        # 'b' is now the least recently used entry
+        cache.put('c', 3, 40)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(1, cache.get('a'))
+        self.assertEqual(3, cache.get('c'))
+        self.assertEqual(80, cache.nbytes)
+
+        # Rejected entries count as misses
+        self.assertIsNone(cache.get('a', lambda value: False))
+        self.assertEqual((3, 2), (cache.hits, cache.misses))
+
+    def test_cached_analysis(self):
+        plain_interpreter = AbstractInterpreter(AbstractInterpreterConfig(domain_handler=self.dbm_handler))
+        cache = TransferCache()
+        cached_config = AbstractInterpreterConfig(domain_handler=self.dbm_handler, transfer_cache=cache)
+
+        for program in ["t1.py", "t2.py", "t3.py", "t4.py", "t5.py", "t6.py"]:
+            filename = self.test_programs_folder + program
+            expected_state = plain_interpreter.execute(filename, "func", self.initial_env)
+
+            # The second analysis is served from the cache and must not differ
+            for _ in range(2):
+                cached_state = AbstractInterpreter(cached_config).execute(filename, "func", self.initial_env)
+                self.assertTrue(self.dbm_handler.are_states_equal(expected_state, cached_state), f"Caching changed the result of {program}")
+
+        # Transfers cheaper than a lookup are not stored, their lookups stay misses
+        self.assertGreater(cache.hits, 0)
+
+    def test_unused_with_parallel_branches(self):
+        config = AbstractInterpreterConfig(domain_handler=self.dbm_handler, transfer_cache=TransferCache(), parallel_branches=True, parallel_min_vars=0)
+        with self.assertWarns(RuntimeWarning):
+            interpreter = AbstractInterpreter(config)
+
+        # Only the interpreter itself warns, not the ones of its branches
+        with interpreter, warnings.catch_warnings():
+            warnings.simplefilter("error")
+            interpreter.execute(self.test_programs_folder + "t1.py", "func", self.initial_env)
+
+    def test_shared_between_domains(self):
+        # One unbounded variable is the same 2x2 matrix in zones and octagons,
+        # the zones entry must not be served to the octagons
+        cache = TransferCache()
+        func_ast = ast.parse("def f(x):\n    x = 5\n").body[0]
+        zones_config = AbstractInterpreterConfig(domain_handler=DbmDomainHandler("zones"), transfer_cache=cache)
+        AbstractInterpreter(zones_config).execute_on_ast(func_ast, {'x': (-math.inf, math.inf)})
+
+        oct_config = replace(zones_config, domain_handler=self.dbm_handler)
+        final_state = AbstractInterpreter(oct_config).execute_on_ast(func_ast, {'x': (-math.inf, math.inf)})
+        self.assertEqual({'x': [5, 5]}, self.dbm_handler.state_to_json(final_state))
+        self.assertEqual(0, cache.hits)
+
+if __name__ == "__main__":
+    unittest.main()